@@ -32,6 +32,10 @@ class NonExistingItemException(OrderAPPException):
     customer_message = "Item does not exist."
 
 
+class InsufficientStockException(OrderAPPException):
+    customer_message = "There is not enough products on stock for your order."
+
+
 # User Exceptions
 class AdminStatusException(OrderAPPException):
     customer_message = "This option is unavailable for you."
@@ -41,6 +45,10 @@ class NonExistingUserException(OrderAPPException):
     customer_message = "User does not exist."
 
 
+class AuthenticationException(OrderAPPException):
+    customer_message = "Not valid credentials. ☻"
+
+
 # Coupon Exceptions
 class InvalidCouponNumberException(OrderAPPException):
     customer_message = "Coupon number is invalid."
@@ -0,0 +1,535 @@
+"""
+Benchmarks of model hot paths on synthetic users, items, orders and coupons.
+Run from the project root:
+    python benchmarks/hot_paths.py [--scale 1k|10k|100k] [--repeat N] [--only TEXT] [--output FILE]
+                                   [--baseline FILE] [--threshold RATIO]
+Files are generated in a temporary directory, so files of the app are not touched. Storage backend is taken
+from STORAGE_BACKEND, as in the app. Interactive methods get scripted answers instead of terminal input,
+and output of all methods is discarded.
+Public model methods are timed directly, except those only called by other methods, which are timed as part of
+their callers: Item.record_item, Coupon.record and Order.get_new_id (creating records), BaseClass.refresh_base
+and User.record_user (User.register), Item.select_item (User.update_items_count), Item.add_new_item and
+Item.delete_item (the User methods of the same name), User.pick_products and User.clear_cart (User.make_order),
+User.user_wants_coupon_discount (User.save_order), User.update_user_orders (User.cancel_order),
+User.select_user_id (User.lock_user) and User.is_admin (User.create_user_object).
+With --baseline, median times are compared with a stored results file, and the command exits with status 1
+when some benchmark got slower than baseline by more than threshold (0.2 means 20 %).
+"""
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import email_validator  # noqa: E402
+
+from models.base_class import BaseClass  # noqa: E402
+from models.coupons import Coupon  # noqa: E402
+from models.items import Item  # noqa: E402
+from models.orders import Order, WHOLESALE_MINIMUM, WHOLESALE_DISCOUNT  # noqa: E402
+from models.users import User  # noqa: E402
+from services.orders import place_order  # noqa: E402
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+THRESHOLD = 0.2
+# Email deliverability is checked over DNS, which would make registration timings depend on network.
+email_validator.CHECK_DELIVERABILITY = False
+
+CASES = {}
+_answers = deque()
+
+
+def case(name: str, setup=None):
+    """
+    Register a benchmark. Only the decorated function is timed, setup(ctx) runs before every run
+    and its result is passed to the function as second argument.
+    :param name: name of the benchmark, str.
+    :param setup: function preparing one run, or None.
+    :return: decorator.
+    """
+    def register(run):
+        CASES[name] = (setup, run)
+        return run
+    return register
+
+
+def answer(*answers) -> None:
+    """
+    Set answers returned by input() in the next benchmark run.
+    :param answers: answers, str.
+    :return: None.
+    """
+    _answers.clear()
+    _answers.extend(answers)
+
+
+def scripted_input(prompt: str = "") -> str:
+    if not _answers:
+        raise RuntimeError(f"No scripted answer for prompt: {prompt}")
+    return _answers.popleft()
+
+
+def generate_files(count: int, seed: int = 0) -> None:
+    """
+    Write users, items, orders and coupons files with count records each, plus email index and sequences.
+    First two users are the admins from .env, every user has a coupon and orders are spread over last year.
+    :param count: number of records in every file, int.
+    :param seed: seed for random data, int.
+    :return: None.
+    """
+    rng = random.Random(seed)
+    items = {
+        str(item_id): {"name": f"Product {item_id}", "price": round(rng.uniform(1, 1000), 2),
+                       "stock": rng.randint(1_000_000, 2_000_000)}
+        for item_id in range(1, count + 1)
+    }
+    users, coupons, email_index = {}, {}, {}
+    admins = list(User.admin_credentials.items())
+    for user_id in range(1, count + 1):
+        if user_id <= len(admins):
+            username, password = admins[user_id - 1]
+            email = f"{username}@order_app.com"
+        else:
+            username, password, email = f"user{user_id}", "password", f"user{user_id}@example.com"
+        coupon = str(uuid.UUID(int=rng.getrandbits(128)))
+        coupons[coupon] = {"used": rng.random() < 0.3}
+        users[str(user_id)] = {"username": username, "email": email, "password": password, "orders": [],
+                               "coupon": coupon}
+        email_index[User.normalize_email(email)] = str(user_id)
+    orders = {}
+    now = datetime.now()
+    for order_id in range(1, count + 1):
+        user_id = str(rng.randint(len(admins) + 1, count))
+        ordered = {str(rng.randint(1, count)): rng.randint(1, 3) for _ in range(rng.randint(1, 5))}
+        subtotal = round(sum(items[item_id]["price"] * quantity for item_id, quantity in ordered.items()), 2)
+        total = round(subtotal * WHOLESALE_DISCOUNT, 2) if subtotal > WHOLESALE_MINIMUM else subtotal
+        date = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        orders[str(order_id)] = {"user": user_id, "items": ordered, "total": total, "coupon_used": False,
+                                 "status": rng.choice(("ordered", "paid")),
+                                 "date": date.isoformat(timespec="seconds")}
+        users[user_id]["orders"].append(order_id)
+    sequences = {Item.filename: count, User.filename: count, Order.filename: count}
+    for filename, records in ((Item.filename, items), (User.filename, users), (Coupon.filename, coupons),
+                              (Order.filename, orders), (User.email_index_filename, email_index),
+                              (BaseClass.sequences_filename, sequences)):
+        BaseClass.storage.init(filename)
+        BaseClass.write(records, filename)
+    if Item.stock_table:
+        Item.stock_table.init()
+
+
+def random_items(ctx, count: int = 3) -> dict:
+    return defaultdict(int, {str(ctx.rng.randint(1, ctx.count)): ctx.rng.randint(1, 3) for _ in range(count)})
+
+
+def new_saved_order(ctx) -> tuple:
+    """Place an unpaid order for the benchmark user and load the user again, as after login."""
+    order_id = place_order(ctx.user_id, random_items(ctx))
+    return User.create_user_object(ctx.user_id), str(order_id)
+
+
+@case("BaseClass.read (cold)", setup=lambda ctx: BaseClass.clear_cache())
+def read_cold(ctx, _):
+    Order.read(Order.filename)
+
+
+@case("BaseClass.read (cached)")
+def read_cached(ctx, _):
+    Order.read(Order.filename)
+
+
+def change_one_order(ctx) -> tuple:
+    orders = Order.read(Order.filename)
+    order_id = str(ctx.rng.randint(1, ctx.count))
+    orders[order_id]["status"] = "paid" if orders[order_id]["status"] == "ordered" else "ordered"
+    return orders, [order_id]
+
+
+@case("BaseClass.write (one changed order)", setup=change_one_order)
+def write_orders(ctx, changed):
+    orders, keys = changed
+    Order.write(orders, Order.filename, keys)
+
+
+@case("Item.create_item_object")
+def create_item_object(ctx, _):
+    Item.create_item_object(str(ctx.rng.randint(1, ctx.count)))
+
+
+@case("Item.show_products")
+def show_products(ctx, _):
+    Item.show_products()
+
+
+@case("Item.check_stock")
+def check_stock(ctx, _):
+    Item.check_stock(str(ctx.rng.randint(1, ctx.count)), 1)
+
+
+@case("Item.update_stock")
+def update_stock(ctx, _):
+    Item.update_stock(str(ctx.rng.randint(1, ctx.count)), 1)
+
+
+@case("Item.reserve_stock (3 items)", setup=random_items)
+def reserve_stock(ctx, items):
+    Item.reserve_stock(items)
+
+
+@case("Item.return_to_stock")
+def return_to_stock(ctx, _):
+    Item.return_to_stock(str(ctx.rng.randint(1, ctx.count)), 1)
+
+
+@case("Coupon.create_coupon_object")
+def create_coupon_object(ctx, _):
+    Coupon.create_coupon_object(ctx.user.coupon)
+
+
+@case("Coupon.get_status")
+def get_coupon_status(ctx, _):
+    Coupon.get_status(ctx.user.coupon)
+
+
+@case("Coupon.use_coupon", setup=lambda ctx: Coupon.create_coupon_object(ctx.user.coupon))
+def use_coupon(ctx, coupon):
+    coupon.use_coupon()
+
+
+@case("Coupon.refund_coupon")
+def refund_coupon(ctx, _):
+    Coupon.refund_coupon(ctx.user.coupon)
+
+
+@case("Order.create_order_object")
+def create_order_object(ctx, _):
+    Order.create_order_object(str(ctx.rng.randint(1, ctx.count)))
+
+
+@case("Order.print_info", setup=lambda ctx: str(ctx.rng.randint(1, ctx.count)))
+def print_info(ctx, order_id):
+    Order.create_order_object(order_id).print_info(order_id)
+
+
+@case("Order.get_total_price", setup=lambda ctx: Order(ctx.user_id, random_items(ctx, 5)))
+def get_total_price(ctx, order):
+    order.get_total_price()
+
+
+@case("Order.record_order", setup=lambda ctx: Order(ctx.user_id, random_items(ctx)))
+def record_order(ctx, order):
+    order.record_order()
+
+
+@case("Order.remove", setup=lambda ctx: place_order(ctx.user_id, random_items(ctx)))
+def remove_order(ctx, order_id):
+    Order.remove(order_id)
+
+
+@case("Order.get_most_popular_items")
+def most_popular_items(ctx, _):
+    Order.get_most_popular_items()
+
+
+@case("User.register")
+def register(ctx, _):
+    number = next(ctx.sequence)
+    answer(f"new{number}", f"new{number}@example.com", "password")
+    User.register()
+
+
+@case("User.is_registered_email")
+def is_registered_email(ctx, _):
+    User.is_registered_email(f"user{ctx.rng.randint(3, ctx.count)}@example.com")
+
+
+@case("User.create_user_object")
+def create_user_object(ctx, _):
+    User.create_user_object(str(ctx.rng.randint(3, ctx.count)))
+
+
+@case("User.validate_email")
+def validate_email(ctx, _):
+    User.validate_email(f"user{ctx.rng.randint(3, ctx.count)}@example.com")
+
+
+@case("User.login")
+def login(ctx, _):
+    user_id = ctx.rng.randint(3, ctx.count)
+    answer(f"user{user_id}@example.com", "password")
+    User.login()
+
+
+@case("User.make_order")
+def make_order(ctx, _):
+    answer(*(value for item_id, quantity in random_items(ctx).items() for value in (item_id, str(quantity))), "f")
+    ctx.user.make_order()
+    ctx.user.clear_cart()
+
+
+def fill_cart(ctx) -> None:
+    ctx.user.order = Order(ctx.user_id, random_items(ctx))
+
+
+@case("User.show_my_cart", setup=fill_cart)
+def show_my_cart(ctx, _):
+    ctx.user.show_my_cart()
+
+
+@case("User.save_order", setup=fill_cart)
+def save_order(ctx, _):
+    answer("n")
+    ctx.user.save_order()
+
+
+@case("User.go_to_payments", setup=new_saved_order)
+def go_to_payments(ctx, saved):
+    user, order_id = saved
+    answer(order_id, "n")
+    user.go_to_payments()
+
+
+@case("User.cancel_order", setup=new_saved_order)
+def cancel_order(ctx, saved):
+    user, order_id = saved
+    answer(order_id)
+    user.cancel_order()
+
+
+@case("User.show_my_saved_orders", setup=new_saved_order)
+def show_my_saved_orders(ctx, saved):
+    user, order_id = saved
+    user.show_my_saved_orders()
+
+
+@case("User.list_my_orders", setup=new_saved_order)
+def list_my_orders(ctx, saved):
+    user, order_id = saved
+    answer(order_id)
+    user.list_my_orders()
+
+
+@case("User.load_my_saved_orders", setup=new_saved_order)
+def load_my_saved_orders(ctx, saved):
+    user, order_id = saved
+    user.load_my_saved_orders()
+
+
+@case("User.choose_saved_order", setup=new_saved_order)
+def choose_saved_order(ctx, saved):
+    user, order_id = saved
+    answer(order_id)
+    user.choose_saved_order()
+
+
+@case("User.has_made_payments", setup=new_saved_order)
+def has_made_payments(ctx, saved):
+    user, order_id = saved
+    user.has_made_payments()
+
+
+@case("User.print_my_receipt", setup=new_saved_order)
+def print_my_receipt(ctx, saved):
+    user, order_id = saved
+    answer("y", "")
+    user.print_my_receipt(order_id)
+
+
+@case("User.generate_excel_file", setup=new_saved_order)
+def generate_excel_file(ctx, saved):
+    user, order_id = saved
+    answer(order_id)
+    user.generate_excel_file()
+
+
+@case("User.show_coupon")
+def show_coupon(ctx, _):
+    ctx.user.show_coupon()
+
+
+@case("User.has_used_coupon")
+def has_used_coupon(ctx, _):
+    ctx.user.has_used_coupon()
+
+
+@case("User.get_orders")
+def get_orders(ctx, _):
+    ctx.admin.get_orders()
+
+
+@case("User.get_brutto_orders")
+def get_brutto_orders(ctx, _):
+    ctx.admin.get_brutto_orders()
+
+
+@case("User.get_total_money_paid")
+def get_total_money_paid(ctx, _):
+    ctx.admin.get_total_money_paid()
+
+
+@case("User.get_used_coupons")
+def get_used_coupons(ctx, _):
+    ctx.admin.get_used_coupons()
+
+
+@case("User.get_users_with_active_coupons")
+def get_users_with_active_coupons(ctx, _):
+    ctx.admin.get_users_with_active_coupons()
+
+
+@case("User.get_revenue_reports")
+def get_revenue_reports(ctx, _):
+    ctx.admin.get_revenue_reports()
+
+
+@case("User.get_popular_items")
+def get_popular_items(ctx, _):
+    answer("", "")
+    ctx.admin.get_popular_items()
+
+
+@case("User.update_items_count")
+def update_items_count(ctx, _):
+    answer(str(ctx.rng.randint(1, ctx.count)), "10.5", "1000000")
+    ctx.admin.update_items_count()
+
+
+@case("User.add_new_item")
+def add_new_item(ctx, _):
+    answer("Benchmark product", "10.5", "100")
+    ctx.admin.add_new_item()
+
+
+@case("User.delete_item", setup=lambda ctx: Item("Benchmark product", 10.5, 100).item_id)
+def delete_item(ctx, item_id):
+    answer(str(item_id), "y")
+    ctx.admin.delete_item()
+
+
+@case("User.lock_user")
+def lock_user(ctx, _):
+    answer(str(ctx.rng.randint(3, ctx.count)))
+    ctx.admin.lock_user(reverse=True)
+
+
+@case("User.export_orders (csv)")
+def export_orders(ctx, _):
+    answer("", "", "csv")
+    ctx.admin.export_orders()
+
+
+@case("services.place_order")
+def service_place_order(ctx, _):
+    place_order(ctx.user_id, random_items(ctx))
+
+
+def run_cases(ctx, repeat: int, only: str = None) -> dict:
+    """
+    Run every registered benchmark repeat times.
+    :param ctx: benchmark context.
+    :param repeat: number of timed runs of every benchmark, int.
+    :param only: run only benchmarks with this text in the name, str or None.
+    :return: dict, benchmark name -> timings in ms, or error.
+    """
+    results = {}
+    for name, (setup, run) in CASES.items():
+        if only and only.lower() not in name.lower():
+            continue
+        times = []
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(repeat):
+                    prepared = setup(ctx) if setup else None
+                    start = time.perf_counter()
+                    run(ctx, prepared)
+                    times.append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"{name:<42} failed: {results[name]['error']}")
+            continue
+        results[name] = {"median_ms": round(statistics.median(times), 3), "min_ms": round(min(times), 3),
+                         "runs": repeat}
+        print(f"{name:<42} {results[name]['median_ms']:>12.3f} ms")
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Compare median times with baseline results.
+    :param results: dict returned by run_cases.
+    :param baseline: dict returned by run_cases for baseline.
+    :param threshold: allowed slowdown ratio, float.
+    :return: list of names of benchmarks slower than baseline by more than threshold.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<42} {'median ms':>12} {'baseline ms':>12} {'change':>8}")
+    for name, result in results.items():
+        previous = baseline.get(name, {})
+        if "median_ms" not in result or not previous.get("median_ms"):
+            continue
+        change = result["median_ms"] / previous["median_ms"] - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<42} {result['median_ms']:>12.3f} {previous['median_ms']:>12.3f} {change:>+8.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark model hot paths on synthetic data.")
+    parser.add_argument("--scale", choices=SCALES, default="1k", help="number of users, items, orders, coupons")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs of every benchmark")
+    parser.add_argument("--only", help="run only benchmarks with this text in the name")
+    parser.add_argument("--output", help="write results to this json file")
+    parser.add_argument("--baseline", help="compare with results stored in this json file")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown, 0.2 = 20 %%")
+    args = parser.parse_args()
+
+    count = SCALES[args.scale]
+    builtins.input = scripted_input
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        os.makedirs("files")
+        start = time.perf_counter()
+        generate_files(count)
+        print(f"Generated {args.scale} records per file in {time.perf_counter() - start:.1f} s")
+        ctx = SimpleNamespace(count=count, rng=random.Random(1), sequence=iter(range(1, 10 ** 9)), user_id="3",
+                              user=User.create_user_object("3"), admin=User.create_user_object("1"))
+        results = run_cases(ctx, args.repeat, args.only)
+        os.chdir(ROOT)
+
+    report = {"scale": args.scale, "repeat": args.repeat, "backend": type(BaseClass.storage).__name__,
+              "python": platform.python_version(), "date": datetime.now().isoformat(timespec="seconds"),
+              "results": results}
+    if args.output:
+        with open(args.output, "w") as writer:
+            json.dump(report, writer, indent=4)
+    if args.baseline:
+        with open(args.baseline) as reader:
+            baseline = json.load(reader)
+        if baseline.get("scale") != args.scale:
+            print(f"Baseline was measured at scale {baseline.get('scale')}, not {args.scale}.")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Measure start up time of the app: time to import main module, which is all the work done before the first menu.
+Run from the project root: python benchmarks/startup.py [--runs N] [--top N] [--budget MS]
+Exits with status 1 when median start up time is over the budget.
+Modules are compiled on first import, so bytecode cache should be writable (PYTHONDONTWRITEBYTECODE not set).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_MS = 100
+
+
+def import_times(module: str = "main") -> list:
+    """
+    Import module in a new interpreter with '-X importtime' and parse its report.
+    :param module: name of imported module.
+    :return: list of (cumulative us, self us, module name), slowest first.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode:
+        raise SystemExit(result.stderr)
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return sorted(times, reverse=True)
+
+
+def startup_ms(module: str = "main", runs: int = 10) -> list:
+    """
+    Wall time of starting a new interpreter and importing module, measured several times.
+    :param module: name of imported module.
+    :param runs: number of runs.
+    :return: list of times in ms.
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="number of measured starts")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports shown")
+    parser.add_argument("--budget", type=float, default=BUDGET_MS, help="allowed median start up time in ms")
+    args = parser.parse_args()
+
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for cumulative_us, self_us, name in import_times()[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+
+    times = startup_ms(runs=args.runs)
+    median = statistics.median(times)
+    print(f"\nStart up: median {median:.1f} ms, min {min(times):.1f} ms, max {max(times):.1f} ms "
+          f"({args.runs} runs, budget {args.budget:.0f} ms)")
+    return 0 if median <= args.budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
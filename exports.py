@@ -0,0 +1,129 @@
+"""Streaming exports of order receipts and order dumps to Excel (openpyxl write-only mode) or csv files."""
+import csv
+import os
+from datetime import date, datetime
+
+from dotenv import load_dotenv
+
+from app_exceptions.exceptions import FileAlreadyCreatedException
+from models.items import Item
+from models.orders import Order
+from models.users import User
+
+load_dotenv()
+
+EXPORT_DIR = os.getenv("EXPORT_DIR", ".")
+FORMATS = ("xlsx", "csv")
+RECEIPT_HEADER = ["Item ID", "Item Name", "Price", "Quantity", "Total"]
+ORDERS_HEADER = ["Order ID", "Date", "User", "Status", "Item ID", "Item Name", "Price", "Quantity", "Total",
+                 "Order Total"]
+
+
+def export_path(filename: str) -> str:
+    """
+    Path of a new file in export directory, which is created if needed.
+    :param filename: str, file name.
+    :return: path, str.
+    """
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, filename)
+    if os.path.exists(path):
+        raise FileAlreadyCreatedException
+    return path
+
+
+def write_rows(path: str, header: list, rows, sheet_name: str = "Sheet") -> int:
+    """
+    Write header and rows one by one, so rows can be generated while writing. Format is chosen by file extension.
+    Excel workbook is written in write-only mode, which keeps written rows out of memory.
+    :param path: str, path of the file.
+    :param header: list of column names.
+    :param rows: iterable of rows (lists).
+    :param sheet_name: str, name of the Excel sheet.
+    :return: number of written rows, int.
+    """
+    count = 0
+    try:
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as writer:
+                table = csv.writer(writer)
+                table.writerow(header)
+                for row in rows:
+                    table.writerow(row)
+                    count += 1
+        else:
+            from openpyxl import Workbook  # imported on use, slow to load
+
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet(sheet_name)
+            sheet.append(header)
+            for row in rows:
+                sheet.append(row)
+                count += 1
+            workbook.save(path)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return count
+
+
+def export_receipt(frame: list, order_id: str, file_format: str = "xlsx") -> str:
+    """
+    Write receipt of one order.
+    :param frame: list of receipt rows.
+    :param order_id: ID of order used for file name.
+    :param file_format: 'xlsx' or 'csv'.
+    :return: path of the file, str.
+    """
+    path = export_path(f"my_order_{order_id}.{file_format}")
+    write_rows(path, RECEIPT_HEADER, frame, sheet_name="my_order")
+    return path
+
+
+def order_rows(start: date = None, end: date = None):
+    """
+    Generate one row per ordered item for orders made between start and end (both included).
+    Orders saved without date are left out when start or end is given.
+    :param start: first day, date or None.
+    :param end: last day, date or None.
+    :return: generator of rows, in ORDERS_HEADER columns.
+    """
+    orders = Order.read(Order.filename)
+    items = Item.read(Item.filename)
+    usernames = User.get_usernames()
+    for order_id, order in orders.items():
+        order_date = order.get("date")
+        if start or end:
+            if not order_date:
+                continue
+            day = date.fromisoformat(order_date[:10])
+            if (start and day < start) or (end and day > end):
+                continue
+        username = usernames.get(str(order["user"]))
+        for item_id, quantity in order["items"].items():
+            item = items.get(str(item_id), {})
+            price = item.get("price")
+            line_total = round(price * quantity, 2) if price is not None else None
+            yield [order_id, order_date, username, order["status"], item_id, item.get("name"), price, quantity,
+                   line_total, order.get("total")]
+
+
+def export_orders(start: date = None, end: date = None, file_format: str = "xlsx") -> tuple:
+    """
+    Write all orders made between start and end (both included), one row per ordered item.
+    :param start: first day, date or None for all earlier orders.
+    :param end: last day, date or None for all later orders.
+    :param file_format: 'xlsx' or 'csv'.
+    :return: tuple with path of the file and number of written rows.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format: {file_format}")
+    name = f"orders_{start or 'first'}_{end or 'last'}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    filename = f"{name}.{file_format}"
+    number = 1
+    while os.path.exists(os.path.join(EXPORT_DIR, filename)):  # exported more than once in the same second
+        number += 1
+        filename = f"{name}_{number}.{file_format}"
+    path = export_path(filename)
+    return path, write_rows(path, ORDERS_HEADER, order_rows(start, end), sheet_name="orders")
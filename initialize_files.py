@@ -4,8 +4,13 @@ from utils import init_file, populate_items
 
 
 if __name__ == "__main__":
+    init_file("files/sequences.txt")
     init_file("files/items.txt")
+    if Item.stock_table:
+        Item.stock_table.init()
     populate_items("files/items.csv", Item)
     init_file("files/coupons.txt")
     init_file("files/orders.txt")
+    init_file("files/sales.txt")
     init_file("files/users.txt")
+    init_file("files/email_index.txt")
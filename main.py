@@ -2,6 +2,7 @@ from models.users import User
 from models.items import Item
 from app_exceptions.exceptions import *
 from utils import mprint
+from storage.instrumentation import io_stats
 
 
 def main():
@@ -9,6 +10,7 @@ def main():
     while not user:
         mprint("\tWelcome to Order APP!", "", "\tA. Register", "\tB. Login", delimiter=" ")
         users_input = input("Enter option or 'end' for exit >>> ").lower()
+        io_stats.start(f"option {users_input.upper()}")
 
         if users_input == "a":
             User.register()
@@ -22,6 +24,8 @@ def main():
         else:
             mprint("Unavailable option.")
 
+        io_stats.finish()
+
     else:
         users_input = None
         while users_input != "end":
@@ -52,7 +56,9 @@ def main():
 \tS. Update Product
 \tT. Delete Product
 \tU. Lock User
-\tV. Unlock User\n""")
+\tV. Unlock User
+\tW. Revenue reports
+\tX. Export orders\n""")
             else:
                 mprint("\tWelcome to Order APP!", delimiter=" ", end="")
                 print("""
@@ -70,6 +76,7 @@ def main():
 \tK. Logout\n""")
 
             users_input = input("Enter option or 'end' for exit >>> ").lower()
+            io_stats.start(f"option {users_input.upper()}")
 
             if users_input == 'a':
                 user.make_order()
@@ -99,8 +106,7 @@ def main():
 
             elif users_input == 'i':
                 try:
-                    Item.show_products()
-                    input("Press any key to continue >> ")
+                    Item.browse_products()
                 except OrderAPPException as e:
                     mprint(str(e))
 
@@ -184,9 +190,27 @@ def main():
                 except AdminStatusException as e:
                     mprint(str(e))
 
+            elif users_input == 'w':
+                try:
+                    user.get_revenue_reports()
+                    input("Press any key to continue >> ")
+                except OrderAPPException as e:
+                    mprint(str(e))
+
+            elif users_input == 'x':
+                try:
+                    user.export_orders()
+                except OrderAPPException as e:
+                    mprint(str(e))
+
             elif users_input != 'end':
                 mprint("Unavailable option.")
 
+            io_stats.finish()
+
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        Item.save_stock()
@@ -0,0 +1,35 @@
+"""Run this file once to import records from files/*.txt into SQLite database (STORAGE_BACKEND=sqlite)."""
+import sqlite3
+import sys
+
+from storage.backends import JsonStorage, get_storage
+
+FILES = ("files/items.txt", "files/coupons.txt", "files/orders.txt", "files/users.txt", "files/sales.txt",
+         "files/email_index.txt", "files/sequences.txt")
+
+
+def migrate(files=FILES) -> None:
+    """
+    Copy records from json files to SQLite tables, replacing existing tables.
+    Param files: names of the files to migrate.
+    Return: None.
+    """
+    source = JsonStorage()
+    target = get_storage("sqlite")
+    for filename in files:
+        try:
+            records = source.load(filename)
+        except FileNotFoundError:
+            print(f"Skipping {filename}, file not found.")
+            continue
+        target.init(filename)
+        try:
+            target.save(filename, records)
+        except sqlite3.IntegrityError as exc:
+            target.init(filename)
+            sys.exit(f"Cannot migrate {filename}: {exc}")
+        print(f"{filename}: {len(records)} records migrated to {target.database}.")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -1,39 +1,260 @@
-import json
+import time
+from contextlib import contextmanager
+
 from app_exceptions.exceptions import *
+from storage.backends import get_storage
+from storage.instrumentation import io_stats
+from storage.locks import file_lock
+from storage.tracking import Records
 
 
 class BaseClass:
     """Base class for subclasses that use files and json for storing objects."""
     total_objects = None
     filename = ""
+    sequences_filename = "files/sequences.txt"
+    record_type = None  # read-only record class from models.records, built by records()
+    storage = get_storage()
+    _cache = {}
 
     @classmethod
     def read(cls, filename: str) -> dict:
         """
-        Read the file and create dict object using json.
+        Read the file and create dict object using storage backend.
+        Parsed records are cached per file and reused until storage signature of the file (mtime, size) changes,
+        so returned dict is shared between callers and should be changed only before writing it back.
+        File is loaded under shared lock, so it is never read in the middle of a transaction's write.
+        Param filename: Name of the file, str.
+        Return: dict.
+        """
+        if not io_stats.enabled:
+            return cls._read(filename)
+        start = time.perf_counter()
+        cached = BaseClass._cache.get(filename)
+        records = cls._read(filename)
+        parsed = BaseClass._cache.get(filename) is not cached
+        io_stats.record("read", filename, time.perf_counter() - start,
+                        cls.storage.size(filename) if parsed else 0, parsed)
+        return records
+
+    @classmethod
+    def _read(cls, filename: str) -> dict:
+        """
+        Read records through the cache, without counting the read.
         Param filename: Name of the file, str.
         Return: dict.
         """
         try:
-            with open(filename) as reader:
-                records = json.loads(reader.read())
+            signature = cls.storage.signature(filename)
+            cached = BaseClass._cache.get(filename)
+            if cached and cached[0] == signature:
+                return cached[1]
+            with file_lock(filename, shared=True):
+                signature = cls.storage.signature(filename)
+                records = Records(cls.storage.load(filename))
+            BaseClass._cache[filename] = (signature, records)
             return records
         except FileNotFoundError as exc:
+            BaseClass._cache.pop(filename, None)
             raise InitializeFileError(f"We cannot find file: {cls.filename}. Make sure you initialized files.") from exc
 
     @classmethod
-    def write(cls, records: dict, filename: str) -> None:
+    def write(cls, records: dict, filename: str, keys: list = None) -> None:
         """
-        Write to file, converting dict object to string using json.
+        Write to file through storage backend.
+        Cached records for the file are updated in place.
         Param records: dict object, representing data from the file.
         Param filename: Name of the file, str.
+        Param keys: keys of changed and deleted records, or None if all records are written.
+        Return: None.
+        """
+        if not io_stats.enabled:
+            return cls._write(records, filename, keys)
+        start = time.perf_counter()
+        cls._write(records, filename, keys)
+        io_stats.record("write", filename, time.perf_counter() - start, cls.storage.size(filename))
+
+    @classmethod
+    def _write(cls, records: dict, filename: str, keys: list = None) -> None:
+        """
+        Write records and update the cache, without counting the write.
+        Param records: dict object, representing data from the file.
+        Param filename: Name of the file, str.
+        Param keys: keys of changed and deleted records, or None if all records are written.
         Return: None.
         """
         try:
-            with open(filename, "w") as writer:
-                writer.write(json.dumps(records, indent=4))
+            cls.storage.save(filename, records, keys)
         except FileNotFoundError as exc:
             raise InitializeFileError(f"We cannot find file: {cls.filename}. Make sure you initialized files.") from exc
+        if keys is None:
+            cached = BaseClass._cache.get(filename)
+            normalized = Records((str(key), value) for key, value in records.items())
+            if cached and cached[1] is records:
+                records.clear()
+                records.update(normalized)
+                normalized = records
+            records = normalized
+        BaseClass._cache[filename] = (cls.storage.signature(filename), records)
+
+    @classmethod
+    @contextmanager
+    def transaction(cls, filename: str, create=False):
+        """
+        Lock the file for read-modify-write cycle, so changes from other processes are not lost.
+        Yields current records, which are written back when the block ends without exception.
+        Only records changed in the block are saved, and nothing is written if no record changed.
+        Nested transactions on the same file are written once, by the outermost one.
+        Param filename: Name of the file, str.
+        Param create: bool, create empty file if it does not exist yet.
+        Yield: dict with records.
+        """
+        with file_lock(filename) as outermost:
+            if outermost:
+                try:
+                    if cls.storage.changed_recently(filename):
+                        cls.clear_cache(filename)
+                except FileNotFoundError as exc:
+                    if not create:
+                        raise InitializeFileError(
+                            f"We cannot find file: {cls.filename}. Make sure you initialized files."
+                        ) from exc
+                    cls.storage.init(filename)
+            records = cls.read(filename)
+            if outermost:
+                records.track()
+            try:
+                yield records
+            except BaseException:
+                if outermost:
+                    records.changes()
+                cls.clear_cache(filename)
+                raise
+            if outermost:
+                keys = records.changes()
+                if keys is None or keys:
+                    cls.write(records, filename, keys)
+
+    @classmethod
+    def find(cls, filename: str, **fields) -> dict:
+        """
+        Find records with given field values. Uses storage indexes when backend has them,
+        otherwise scans records.
+        Param filename: Name of the file, str.
+        Param fields: record field names and searched values.
+        Return: dict with matching records.
+        """
+        if hasattr(cls.storage, "find"):
+            try:
+                found = cls.storage.find(filename, fields)
+            except FileNotFoundError as exc:
+                raise InitializeFileError(
+                    f"We cannot find file: {cls.filename}. Make sure you initialized files."
+                ) from exc
+            if found is not None:
+                return found
+        records = cls.read(filename)
+        return {
+            key: record for key, record in records.items()
+            if all(record.get(field) == value for field, value in fields.items())
+        }
+
+    @classmethod
+    def records(cls, **fields) -> list:
+        """
+        Read-only records of this class (record_type), built from stored records without creating model objects.
+        Param fields: record field names and searched values, to get only matching records.
+        Return: list of records.
+        """
+        records = cls.find(cls.filename, **fields) if fields else cls.read(cls.filename)
+        return [cls.record_type.from_record(key, record) for key, record in records.items()]
+
+    @classmethod
+    def id_ranges(cls, filename: str, count: int) -> list:
+        """
+        Split numeric record keys of the file into ranges of the same width, for reading the file in shards.
+        Param filename: Name of the file, str.
+        Param count: number of ranges, int.
+        Return: list of (low, high) tuples, both included. Empty list if the file has no numeric keys.
+        """
+        try:
+            if hasattr(cls.storage, "key_bounds"):
+                low, high = cls.storage.key_bounds(filename)
+            else:
+                keys = [int(key) for key in cls.read(filename) if key.isdigit()]
+                low, high = (min(keys), max(keys)) if keys else (None, None)
+        except FileNotFoundError as exc:
+            raise InitializeFileError(f"We cannot find file: {cls.filename}. Make sure you initialized files.") from exc
+        if low is None:
+            return []
+        width = -(-(high - low + 1) // count)
+        return [(start, min(start + width - 1, high)) for start in range(low, high + 1, width)]
+
+    @classmethod
+    def read_range(cls, filename: str, low: int, high: int) -> dict:
+        """
+        Read records with numeric keys from low to high (both included). Storage reads only those records
+        when backend supports it, otherwise they are taken from all records.
+        Param filename: Name of the file, str.
+        Param low: lowest key, int.
+        Param high: highest key, int.
+        Return: dict.
+        """
+        if hasattr(cls.storage, "load_range"):
+            try:
+                with file_lock(filename, shared=True):
+                    return cls.storage.load_range(filename, low, high)
+            except FileNotFoundError as exc:
+                raise InitializeFileError(
+                    f"We cannot find file: {cls.filename}. Make sure you initialized files."
+                ) from exc
+        return {key: record for key, record in cls.read(filename).items() if key.isdigit() and low <= int(key) <= high}
+
+    @classmethod
+    def reserve_ids(cls, count: int = 1) -> range:
+        """
+        Reserve block of new IDs for records of this class.
+        Last given ID of every file is kept in sequences file, so IDs are never given twice,
+        not even after records are deleted. Sequences file is locked while IDs are reserved.
+        Param count: number of IDs, int.
+        Return: range of reserved IDs.
+        """
+        try:
+            seeded = cls.filename in cls.read(cls.sequences_filename)
+        except InitializeFileError:
+            seeded = False
+        highest_id = 0
+        if not seeded:
+            # Records are read before sequences file is locked, like in callers that lock records file first,
+            # so the two files are never locked in opposite order.
+            records = cls.read(cls.filename)
+            highest_id = max((int(key) for key in records if key.isdigit()), default=0)
+        with cls.transaction(cls.sequences_filename, create=True) as sequences:
+            last_id = sequences.get(cls.filename)
+            if last_id is None:
+                last_id = highest_id
+            sequences[cls.filename] = last_id + count
+        return range(last_id + 1, last_id + count + 1)
+
+    @classmethod
+    def next_id(cls) -> int:
+        """
+        Reserve one new ID for record of this class.
+        Return: ID, int.
+        """
+        return cls.reserve_ids()[0]
+
+    @classmethod
+    def clear_cache(cls, filename: str = None) -> None:
+        """
+        Drop cached records for one file, or for all files if filename is not given.
+        Param filename: Name of the file, str.
+        Return: None.
+        """
+        if filename is None:
+            BaseClass._cache.clear()
+        else:
+            BaseClass._cache.pop(filename, None)
 
     def refresh_base(self) -> None:
         """
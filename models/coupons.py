@@ -1,6 +1,7 @@
 from uuid import uuid4
 
 from models.base_class import BaseClass
+from models.records import CouponRecord
 from app_exceptions.exceptions import *
 from utils import mprint
 
@@ -8,11 +9,13 @@ from utils import mprint
 class Coupon(BaseClass):
     """Model for a coupon."""
     filename = "files/coupons.txt"
+    record_type = CouponRecord
 
-    def __init__(self, value=None, is_used=False):
+    def __init__(self, value=None, is_used=False, persist=True):
         self.__value = str(uuid4()) if value is None else value
         self.__is_used = is_used
-        self.record()
+        if persist:
+            self.record()
 
     def __repr__(self):
         return f"{self.value}"
@@ -47,15 +50,23 @@ class Coupon(BaseClass):
     @classmethod
     def create_coupon_object(cls, value) -> "Coupon":
         """
-        Create Coupon instance.
+        Create Coupon instance from the file, without saving it again.
         :param value: coupon value.
-        :return:
+        :return: Coupon instance, or None if coupon does not exist.
         """
         coupons = cls.read(cls.filename)
-        for coupon in coupons:
-            if coupon == value:
-                used = coupons[coupon].get("used", False)
-                return Coupon(value=value, is_used=used)
+        if value in coupons:
+            used = coupons[value].get("used", False)
+            return Coupon(value=value, is_used=used, persist=False)
+
+    @classmethod
+    def get_coupons(cls, used: bool) -> dict:
+        """
+        Get used or unused coupons, using storage index on coupon status when there is one.
+        :param used: bool, coupon status.
+        :return: dict, coupon value -> coupon record.
+        """
+        return cls.find(cls.filename, used=used)
 
     @classmethod
     def refund_coupon(cls, value) -> None:
@@ -64,10 +75,9 @@ class Coupon(BaseClass):
         Param value: coupon number.
         Return: None.
         """
-        coupons = cls.read(cls.filename)
         try:
-            coupons[value]["used"] = False
-            cls.write(coupons, cls.filename)
+            with cls.transaction(cls.filename) as coupons:
+                coupons[value]["used"] = False
         except KeyError as exc:
             raise InvalidCouponNumberException from exc
 
@@ -87,6 +97,5 @@ class Coupon(BaseClass):
         Save a coupon to file.
         :return: None.
         """
-        coupons = self.read(self.filename)
-        coupons[self.value] = {"used": self.is_used}
-        self.write(coupons, self.filename)
+        with self.transaction(self.filename) as coupons:
+            coupons[self.value] = {"used": self.is_used}
@@ -1,16 +1,38 @@
+import csv
+import math
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+
+from dotenv import load_dotenv
+
 from models.base_class import BaseClass
+from models.records import ItemRecord
 from app_exceptions.exceptions import *
+from storage.locks import file_lock
+from storage.stock_table import get_stock_table
 from utils import mprint
 
+load_dotenv()
+
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", 100))
+
 
 class Item(BaseClass):
     """Model for Item."""
     filename = "files/items.txt"
+    record_type = ItemRecord
     total_objects = None
+    # Rendered catalog: item ID -> (lowercase name, in stock, line), valid for items file with _catalog_signature.
+    _catalog = {}
+    _catalog_signature = None
+    _catalog_dirty = {}  # IDs of changed items, in order of change (dict used as ordered set)
+    _catalog_lock = threading.Lock()  # threads serving requests refresh the catalog one at a time
+    # Prices and stocks in memory-mapped table (STOCK_TABLE), where stock is kept instead of items file.
+    stock_table = get_stock_table()
 
     def __init__(self, name: str, price: float, stock: int, item_id=None):
-        self.refresh_base()
-        self.__id = self.total_objects + 1 if item_id is None else item_id
+        self.__id = self.next_id() if item_id is None else item_id
         self.name = name
         self.__price = price
         self.__stock = stock
@@ -53,33 +75,223 @@ class Item(BaseClass):
         """
         products = cls.read(cls.filename)
         if item_id in products:
-            return Item(products[item_id]["name"], products[item_id]["price"], products[item_id]["stock"], item_id)
+            product = cls.live_product(item_id, products[item_id])
+            return Item(product["name"], product["price"], product["stock"], item_id)
         else:
             raise NonExistingItemException
 
     @classmethod
-    def show_products(cls) -> None:
+    def records(cls, **fields) -> list:
         """
-        Prints all items on stdout.
-        :return: None.
+        Read-only item records, with stock from stock table when it is used.
+        Param fields: record field names and searched values, to get only matching records.
+        Return: list of ItemRecord.
         """
-        products = cls.read(cls.filename)
+        records = cls.find(cls.filename, **fields) if fields else cls.read(cls.filename)
+        return [ItemRecord.from_record(item_id, cls.live_product(item_id, record)) for item_id, record in records.items()]
+
+    @classmethod
+    def stocks(cls):
+        """
+        Get stock table, filled from items file if it is new.
+        Return: StockTable, or None if stock table is not used.
+        """
+        table = cls.stock_table
+        if table is not None and table.generation == 0:
+            with file_lock(cls.filename, shared=True), table.locked():
+                if table.generation == 0:
+                    table.load(cls.read(cls.filename))
+        return table
+
+    @classmethod
+    def live_product(cls, item_id: str, product: dict) -> dict:
+        """
+        Item record with current stock, which is in stock table when it is used.
+        Param item_id: item ID, str.
+        Param product: item record from items file.
+        Return: dict.
+        """
+        table = cls.stocks()
+        row = table.get(item_id) if table is not None else None
+        return product if row is None else {**product, "stock": row[1]}
+
+    @classmethod
+    def catalog_signature(cls) -> tuple:
+        """
+        Signature of cached items file and generation of stock table, both change when rendered catalog may change.
+        Return: tuple.
+        """
+        table = cls.stocks()
+        return cls._cache[cls.filename][0], table.generation if table is not None else None
+
+    @staticmethod
+    def render_product(item_id: str, product: dict) -> str:
+        """
+        Catalog line of one product.
+        Param item_id: item ID, str.
+        Param product: item record.
+        Return: str.
+        """
+        if product["stock"] > 0:
+            line = "." * (64 - len(product["name"]))
+            return f"{item_id:<3} - {product['name']} {line} {product['price']:>8}\n"
+        return f"{item_id:<3} - {product['name']} - {'currently not available on stock':>}.\n"
+
+    @classmethod
+    def refresh_catalog(cls) -> dict:
+        """
+        Bring rendered catalog up to date with items file. Only items changed by this process since the last
+        refresh are rendered again, whole catalog is rendered when the file was changed by another process.
+        Return: dict, item ID -> (lowercase name, in stock, line).
+        """
+        with cls._catalog_lock:
+            products = cls.read(cls.filename)
+            signature = cls.catalog_signature()
+            if signature != cls._catalog_signature:
+                Item._catalog = {}
+                for item_id, product in products.items():
+                    product = cls.live_product(item_id, product)
+                    cls._catalog[item_id] = (product["name"].lower(), product["stock"] > 0,
+                                             cls.render_product(item_id, product))
+            else:
+                for item_id in cls._catalog_dirty:
+                    if item_id in products:
+                        product = cls.live_product(item_id, products[item_id])
+                        cls._catalog[item_id] = (product["name"].lower(), product["stock"] > 0,
+                                                 cls.render_product(item_id, product))
+                    else:
+                        cls._catalog.pop(item_id, None)
+            cls._catalog_dirty.clear()
+            Item._catalog_signature = signature
+            return cls._catalog
+
+    @classmethod
+    @contextmanager
+    def catalog_transaction(cls, item_ids):
+        """
+        Transaction on items file, after which only given items are rendered again in the catalog.
+        If items file was changed by another process before, the whole catalog is rendered on next refresh.
+        When stock table is used, given items get current stock before the block, and their prices and stocks
+        are saved in the table after it.
+        Param item_ids: IDs of changed items.
+        Yield: dict with records.
+        """
+        item_ids = [str(item_id) for item_id in item_ids]
+        table = cls.stocks()
+        with cls.transaction(cls.filename) as items, table.locked() if table is not None else nullcontext():
+            before = cls.catalog_signature()
+            if table is not None:
+                for item_id in item_ids:
+                    row = table.get(item_id)
+                    if row is not None and item_id in items:
+                        items[item_id]["stock"] = row[1]
+            yield items
+            if table is not None:
+                for item_id in item_ids:
+                    if item_id in items:
+                        table.put(item_id, items[item_id]["price"], items[item_id]["stock"])
+                    else:
+                        table.remove(item_id)
+        if before == cls._catalog_signature and cls.filename in cls._cache:
+            cls._catalog_dirty.update(dict.fromkeys(item_ids))
+            Item._catalog_signature = cls.catalog_signature()
+
+    @classmethod
+    @contextmanager
+    def stock_transaction(cls, item_ids):
+        """
+        Change stock of given items in stock table only, after which they are rendered again in the catalog.
+        Param item_ids: IDs of changed items.
+        Yield: StockTable.
+        """
+        cls.read(cls.filename)
+        with cls.stocks().locked() as table:
+            before = cls.catalog_signature()
+            yield table
+        if before == cls._catalog_signature:
+            cls._catalog_dirty.update(dict.fromkeys(str(item_id) for item_id in item_ids))
+            Item._catalog_signature = cls.catalog_signature()
+
+    @classmethod
+    def save_stock(cls) -> None:
+        """
+        Save current stocks from stock table to items file, so the file is up to date when the table is not used
+        any more. Called when the CLI, API server and batch ingestion exit.
+        Return: None.
+        """
+        if cls.stock_table is None:
+            return
+        with cls.catalog_transaction(list(cls.read(cls.filename))):
+            pass
+
+    @classmethod
+    def catalog_lines(cls, query: str = None) -> list:
+        """
+        Catalog lines of products with query in the name, or with query as the code.
+        Param query: searched text, str, or None for all products.
+        Return: list of lines.
+        """
+        catalog = cls.refresh_catalog()
+        if not query:
+            return [line for _, _, line in catalog.values()]
+        query = query.strip().lower()
+        return [line for item_id, (name, _, line) in catalog.items() if query == item_id or query in name]
+
+    @classmethod
+    def catalog_ids(cls, query: str = None) -> list:
+        """
+        IDs of products with query in the name, or with query as the code, in catalog order.
+        Param query: searched text, str, or None for all products.
+        Return: list of item IDs.
+        """
+        catalog = cls.refresh_catalog()
+        if not query:
+            return list(catalog)
+        query = query.strip().lower()
+        return [item_id for item_id, (name, _, _) in catalog.items() if query == item_id or query in name]
+
+    @classmethod
+    def show_products(cls, query: str = None, page: int = 1, page_size: int = CATALOG_PAGE_SIZE) -> int:
+        """
+        Prints one page of products on stdout.
+        :param query: show only products with this text in the name (or code), str or None.
+        :param page: page number, starting with 1.
+        :param page_size: number of products on page, 0 for all products.
+        :return: number of pages, int.
+        """
+        lines = cls.catalog_lines(query)
+        pages = max(1, math.ceil(len(lines) / page_size)) if page_size else 1
         white_space = " " * 55
         mprint(f"{'Order APP Products':^75s}", delimiter=" ")
         mprint(f"Code - Product{white_space}Price (EUR)", delimiter=".")
-        to_print = ""
-        for item_id in products:
-            try:
-                item = cls.create_item_object(item_id)
-                if item.stock > 0:
-                    length = 64 - len(item.name)
-                    line = "." * length
-                    to_print += f"{item.item_id:<3} - {item.name} {line} {item.price:>8}\n"
-                else:
-                    to_print += f"{item.item_id:<3} - {item.name} - {'currently not available on stock':>}.\n"
-            except OrderAPPException as e:
-                mprint(e.__str__())
-        mprint(to_print)
+        if page_size:
+            lines = lines[(page - 1) * page_size:page * page_size]
+        mprint("".join(lines))
+        if pages > 1:
+            print(f"Page {page} of {pages}. Use option I to browse and search all products.")
+        return pages
+
+    @classmethod
+    def browse_products(cls) -> None:
+        """
+        Show products page by page, optionally searching them by name or code.
+        :return: None.
+        """
+        query = None
+        page = 1
+        while True:
+            pages = cls.show_products(query, page)
+            choice = input("Enter 'n' or 'p' for next or previous page, '/text' to search products "
+                           "or any other key to continue >> ")
+            if choice.lower() == 'n' and page < pages:
+                page += 1
+            elif choice.lower() == 'p' and page > 1:
+                page -= 1
+            elif choice.startswith('/'):
+                query = choice[1:] or None
+                page = 1
+            elif choice.lower() not in ('n', 'p'):
+                return
 
     @classmethod
     def check_stock(cls, item_id: str, quantity: int) -> bool:
@@ -89,6 +301,12 @@ class Item(BaseClass):
         Param quantity: Quantity that is requested.
         Return: bool.
         """
+        if cls.stock_table is not None:
+            row = cls.stocks().get(item_id)
+            if row is None:
+                mprint(NonExistingItemException().__str__())
+                return False
+            return row[1] >= quantity
         try:
             item = cls.create_item_object(item_id)
             if item and item.stock >= quantity:
@@ -105,11 +323,7 @@ class Item(BaseClass):
         Param qty: count of item.
         Return: None.
         """
-        items = cls.read(cls.filename)
-        if item_id in items:
-            items[item_id]["stock"] += qty
-            cls.write(items, cls.filename)
-        else:
+        if cls.reserve_stock({item_id: qty}, release=True):
             raise NonExistingItemException
 
     @classmethod
@@ -148,9 +362,8 @@ class Item(BaseClass):
         Record new Item.
         :return:
         """
-        items = self.read(self.filename)
-        items[self.item_id] = {"name": self.name, "price": self.price, "stock": self.stock}
-        self.write(items, self.filename)
+        with self.catalog_transaction([self.item_id]) as items:
+            items[str(self.item_id)] = {"name": self.name, "price": self.price, "stock": self.stock}
 
     @classmethod
     def update_stock(cls, item_id: str, quantity: int, new_price: float = None, adding=False) -> None:
@@ -162,18 +375,50 @@ class Item(BaseClass):
         Param adding: bool, True if we are adding to stock.
         Return: None.
         """
-        items = cls.read(cls.filename)
+        if cls.stock_table is not None and not new_price:
+            with cls.stock_transaction([item_id]) as table:
+                row = table.get(item_id)
+                if row is None:
+                    raise NonExistingItemException
+                table.put(item_id, row[0], quantity if adding else row[1] - quantity)
+            return
         try:
-            if adding:
-                items[item_id]["stock"] = quantity
-            else:
-                items[item_id]["stock"] -= quantity
-            if new_price:
-                items[item_id]["price"] = new_price
-            cls.write(items, cls.filename)
+            with cls.catalog_transaction([item_id]) as items:
+                if adding:
+                    items[item_id]["stock"] = quantity
+                else:
+                    items[item_id]["stock"] -= quantity
+                if new_price:
+                    items[item_id]["price"] = new_price
         except KeyError as exc:
             raise NonExistingItemException from exc
 
+    @classmethod
+    def reserve_stock(cls, quantities: dict, release=False) -> dict:
+        """
+        Take quantities of several items from stock with one read and one write of items file.
+        If any item does not exist or has not enough pieces on stock, stock is not changed at all.
+        Param quantities: dict, item ID -> quantity.
+        Param release: bool, True if quantities are returned to stock (missing items are skipped).
+        Return: dict, item ID -> missing quantity. Empty if all quantities are reserved.
+        """
+        if cls.stock_table is not None:
+            with cls.stock_transaction(quantities) as table:
+                return table.reserve(quantities, release)
+        with cls.catalog_transaction(quantities) as items:
+            shortfalls = {}
+            for item_id, qty in quantities.items():
+                if item_id not in items:
+                    shortfalls[item_id] = qty
+                elif not release and items[item_id]["stock"] < qty:
+                    shortfalls[item_id] = qty - items[item_id]["stock"]
+            if shortfalls and not release:
+                return shortfalls
+            for item_id, qty in quantities.items():
+                if item_id in items:
+                    items[item_id]["stock"] += qty if release else -qty
+        return shortfalls
+
     @classmethod
     def add_new_item(cls) -> None:
         """
@@ -201,6 +446,53 @@ class Item(BaseClass):
         Item(name=item_name.title(), price=price, stock=int(count))
         mprint("New Item added! ☻")
 
+    @classmethod
+    def import_many(cls, rows) -> list:
+        """
+        Add many new Items with one block of IDs and one write of items file.
+        Param rows: iterable of (name, price, stock) rows.
+        Return: list of rejected rows as (row number, row, reason) tuples.
+        """
+        valid = []
+        rejected = []
+        for number, row in enumerate(rows, 1):
+            try:
+                name, price, stock = row
+                name = str(name or "").strip()
+                if not name:
+                    raise OrderAPPException("Missing product name.")
+                try:
+                    price = float(price)
+                except (TypeError, ValueError) as exc:
+                    raise ItemPriceException from exc
+                if not math.isfinite(price) or price < 0:
+                    raise ItemPriceException
+                stock = str(stock).strip()
+                if not stock.isdigit():
+                    raise InvalidStockNumberException
+                valid.append((name, price, int(stock)))
+            except OrderAPPException as e:
+                rejected.append((number, row, e.__str__()))
+            except ValueError:
+                rejected.append((number, row, "Row must have name, price and stock."))
+        if valid:
+            ids = cls.reserve_ids(len(valid))
+            with cls.catalog_transaction(ids) as items:
+                for item_id, (name, price, stock) in zip(ids, valid):
+                    items[str(item_id)] = {"name": name, "price": price, "stock": stock}
+        return rejected
+
+    @classmethod
+    def import_csv(cls, filename: str) -> list:
+        """
+        Add Items from csv file with 'item_name', 'price' and 'quantity' columns, reading it row by row.
+        Param filename: csv file name, str.
+        Return: list of rejected rows as (row number, row, reason) tuples.
+        """
+        with open(filename, newline="") as reader:
+            rows = csv.DictReader(reader)
+            return cls.import_many((row.get("item_name"), row.get("price"), row.get("quantity")) for row in rows)
+
     @classmethod
     def delete_item(cls, item_id: str) -> None:
         """
@@ -208,8 +500,7 @@ class Item(BaseClass):
         Param item_id: item's ID
         Return: None.
         """
-        items = cls.read(cls.filename)
-        if item_id not in items:
-            raise NonExistingItemException
-        del items[item_id]
-        cls.write(items, cls.filename)
+        with cls.catalog_transaction([item_id]) as items:
+            if item_id not in items:
+                raise NonExistingItemException
+            del items[item_id]
@@ -1,10 +1,12 @@
 import typing
 import os
-from collections import defaultdict
+from datetime import datetime
 from dotenv import load_dotenv
 
 from models.items import Item
 from models.base_class import BaseClass
+from models.records import ItemRecord, OrderRecord
+from models.sales import Sales
 from utils import mprint
 from app_exceptions.exceptions import *
 
@@ -19,44 +21,42 @@ class Order(BaseClass):
     """Model for Order."""
     total_objects = None
     filename = "files/orders.txt"
+    record_type = OrderRecord
 
     def __init__(self, user_id: str, items: typing.Dict, status="pending", coupon_used=False, order_id=None):
-        self.refresh_base()
-        self.__id = order_id if order_id else self.get_new_id()
+        self.__id = order_id
         self.user_id = user_id
         self.items = items
         self.status = status
         self.coupon_used = coupon_used
+        self.__priced = None
 
     def __repr__(self):
         strng = "Items: \n"
-        items = Item.read(Item.filename)
-        for item, value in self.items.items():
-            strng += f"{items[item]['name']} x {value} pieces\n"
-        strng += f"\ntotal: {self.get_total_price()} EUR | status: {self.status}\n"
-        if self.coupon_used:
+        for name, _, quantity, _ in self.get_lines().values():
+            strng += f"{name} x {quantity} pieces\n"
+        subtotal, discount, total = self.price_summary()
+        strng += f"\ntotal: {subtotal} EUR | status: {self.status}\n"
+        if discount == "coupon":
             strng += f"Coupon discount (5%) will be applied on total amount.\n"
-            strng += f"Total: {round(self.get_total_price() * COUPON_DISCOUNT, 2)} EUR"
-        elif self.get_total_price() > WHOLESALE_MINIMUM:
+            strng += f"Total: {total} EUR"
+        elif discount == "wholesale":
             strng += "Wholesale discount (15%) will be applied on total amount.\n"
-            strng += f"Total: {round(self.get_total_price() * WHOLESALE_DISCOUNT, 2)} EUR"
+            strng += f"Total: {total} EUR"
         return strng
 
     @property
     def order_id(self):
+        if not self.__id:
+            self.__id = self.get_new_id()
         return self.__id
 
     def get_new_id(self) -> int:
         """
-        Generating ID for new Item.
+        Generating ID for new Order. ID is taken when Order gets saved, not when it is put in Cart.
         :return: ID, int.
         """
-        orders = self.read(self.filename)
-        if self.total_objects == 0:
-            return 1
-        while str(self.total_objects) in orders:
-            self.total_objects += 1
-        return self.total_objects
+        return self.next_id()
 
     @classmethod
     def create_order_object(cls, order_id: str) -> "Order":
@@ -78,93 +78,137 @@ class Order(BaseClass):
     @classmethod
     def remove(cls, order_id: int) -> None:
         """
-        Removing order and restoring items on stock.
+        Removing order, restoring items on stock and taking them out of sales counters.
         :param order_id: order ID, int.
         :return: None.
         """
         order_id = str(order_id)
-        orders = cls.read(cls.filename)
         try:
-            items = orders[order_id].get("items")
-            for key, value in items.items():
-                try:
-                    Item.return_to_stock(key, value)
-                except OrderAPPException as e:
-                    mprint(e.__str__())
-            orders.pop(order_id)
-            cls.write(orders, cls.filename)
+            with cls.transaction(cls.filename) as orders:
+                items = orders[order_id].get("items")
+                for _ in Item.reserve_stock(items, release=True):
+                    mprint(NonExistingItemException().__str__())
+                Sales.add({(orders[order_id].get("date") or "")[:10] or None: items}, removed=True)
+                orders.pop(order_id)
         except OrderAPPException as e:
             mprint(e.__str__())
 
     @classmethod
-    def get_most_popular_items(cls) -> None:
+    def get_most_popular_items(cls, count: int = 3, days: int = None) -> None:
         """
-        Printing three most popular items on stdout.
+        Printing most popular items on stdout, from sales counters.
+        Param count: number of items, int.
+        Param days: count only orders of last days, or None for all orders.
         Return: None.
         """
         try:
-            orders = cls.read(cls.filename)
+            popular_items = Sales.top_items(count, days)
+            products = Item.read(Item.filename)
         except OrderAPPException as e:
             mprint(e.__str__())
             return
-        popular_items = defaultdict(int)
-        for order in orders:
-            for key, value in orders[order]["items"].items():
-                popular_items[key] += value
-        items = list(popular_items.items())
-        items.sort(key=lambda x: x[1], reverse=True)
-        mprint("Three most popular products are:", delimiter="_")
-        for item, qty in items[:3]:
-            try:
-                product = Item.create_item_object(item)
-                print(f"Product: {product.name} | sold: {qty} pieces.")
-            except OrderAPPException as e:
-                mprint(e.__str__())
+        if count == 3 and days is None:
+            mprint("Three most popular products are:", delimiter="_")
+        else:
+            mprint(f"{count} most popular products{f' in last {days} days' if days else ''} are:", delimiter="_")
+        for item_id, qty in popular_items:
+            if item_id in products:
+                print(f"Product: {products[item_id]['name']} | sold: {qty} pieces.")
+            else:
+                mprint(NonExistingItemException().__str__())
 
     def get_total_price(self, update=False):
         """
         Calculating total amount for order.
-        Param update: If update is True, updating items stock.
+        Param update: If update is True, reserving ordered items on stock.
+        Return: total amount, float.
+        """
+        if update:
+            shortfalls = Item.reserve_stock(self.items)
+            if shortfalls:
+                raise InsufficientStockException(
+                    f"Not enough products on stock for items: {', '.join(map(str, shortfalls))}."
+                )
+        return self.price_summary()[0]
+
+    def price_summary(self) -> tuple:
+        """
+        Calculating subtotal, discount and total for order from one read of items file.
+        Result is cached until items (or coupon usage) of the order change.
+        Return: tuple with subtotal, discount ('coupon', 'wholesale' or None) and total.
+        """
+        self.__price_items()
+        return self.__priced[3]
+
+    def get_lines(self) -> dict:
+        """
+        Get priced order lines, cached the same way as price_summary.
+        Return: dict, item ID -> (name, price, quantity, line total).
+        """
+        self.__price_items()
+        return self.__priced[2]
+
+    def __price_items(self) -> None:
+        """
+        Price all order items if items or coupon usage changed since they were last priced.
         Return: None.
         """
+        if self.__priced and self.__priced[0] == self.items and self.__priced[1] == self.coupon_used:
+            return
+        products = Item.read(Item.filename)
+        lines = {}
         total = 0
         for item, quantity in self.items.items():
-            product = Item.create_item_object(item)
-            if update:
-                try:
-                    product.update_stock(item, quantity)
-                except OrderAPPException as e:
-                    mprint(e.__str__())
-            price = product.price * quantity
-            total += price
-        return round(total, 2)
+            if item not in products:
+                raise NonExistingItemException
+            price = products[item]["price"]
+            lines[item] = (products[item]["name"], price, quantity, round(price * quantity, 2))
+            total += price * quantity
+        subtotal = round(total, 2)
+        if self.coupon_used:
+            summary = subtotal, "coupon", round(subtotal * COUPON_DISCOUNT, 2)
+        elif subtotal > WHOLESALE_MINIMUM:
+            summary = subtotal, "wholesale", round(subtotal * WHOLESALE_DISCOUNT, 2)
+        else:
+            summary = subtotal, None, subtotal
+        self.__priced = (dict(self.items), self.coupon_used, lines, summary)
 
     def record_order(self, apply_coupon=False):
         """
-        Saving new Order to file.
+        Saving new Order to file and reserving ordered items on stock.
+        Raises InsufficientStockException if some item is not available, without saving the Order.
         Param apply_coupon: applies coupon discount if True
         Return: None.
         """
-        orders = self.read(self.filename)
-        if apply_coupon:
-            total_price = round(self.get_total_price(update=True) * COUPON_DISCOUNT, 2)
-            self.coupon_used = True
-            mprint(f"Coupon discount of 5% applied on your order. Total balance is: {total_price} EUR")
-        elif self.get_total_price() > WHOLESALE_MINIMUM:
-            total_price = round(self.get_total_price(update=True) * WHOLESALE_DISCOUNT, 2)
-            mprint(f"Wholesale discount applied on your order. Total balance is: {total_price} EUR")
-        else:
-            total_price = self.get_total_price(update=True)
-            mprint(f"There is no discount on your total amount. Total balance is: {total_price} EUR")
-        self.status = "ordered"
-        orders[self.order_id] = {
+        with self.transaction(self.filename) as orders:
+            self.get_total_price(update=True)
+            if apply_coupon:
+                self.coupon_used = True
+            _, discount, total_price = self.price_summary()
+            if discount == "coupon":
+                mprint(f"Coupon discount of 5% applied on your order. Total balance is: {total_price} EUR")
+            elif discount == "wholesale":
+                mprint(f"Wholesale discount applied on your order. Total balance is: {total_price} EUR")
+            else:
+                mprint(f"There is no discount on your total amount. Total balance is: {total_price} EUR")
+            self.status = "ordered"
+            record = self.to_record()
+            Sales.add({record["date"][:10]: record["items"]})
+            orders[self.order_id] = record
+
+    def to_record(self) -> dict:
+        """
+        Order as it is saved in orders file, dated now.
+        Return: dict.
+        """
+        return {
             "user": self.user_id,
-            "items": self.items,
-            "total": total_price,
-            "coupon_used": apply_coupon,
-            "status": self.status
+            "items": dict(self.items),
+            "total": self.price_summary()[2],
+            "coupon_used": self.coupon_used,
+            "status": self.status,
+            "date": datetime.now().isoformat(timespec="seconds")
         }
-        self.write(orders, self.filename)
 
     def print_info(self, order_id: str) -> None:
         """
@@ -176,9 +220,12 @@ class Order(BaseClass):
         if orders.get(order_id, None):
             total = 0
             items = orders[order_id]["items"]
+            products = Item.read(Item.filename)
             mprint(f"Order ID: {order_id}", delimiter="_")
             for item in items:
-                item_obj = Item.create_item_object(item)
-                total += item_obj.price * items[item]
-                print(f"You have ordered {item_obj.name} x {items[item]} pieces.")
+                if item not in products:
+                    raise NonExistingItemException
+                item_record = ItemRecord.from_record(item, products[item])
+                total += item_record.price * items[item]
+                print(f"You have ordered {item_record.name} x {items[item]} pieces.")
             print(f"Total: {total:.2f} EUR")
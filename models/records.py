@@ -0,0 +1,58 @@
+"""
+Read-only records for reports and listings. Records are named tuples built from stored dicts without any file
+access, so they are smaller and faster to create than model objects, which stay for changing records.
+"""
+from typing import Mapping, NamedTuple
+
+
+class ItemRecord(NamedTuple):
+    item_id: str
+    name: str
+    price: float
+    stock: int
+
+    @classmethod
+    def from_record(cls, item_id, record: dict) -> "ItemRecord":
+        return cls(str(item_id), record["name"], record["price"], record["stock"])
+
+
+class OrderRecord(NamedTuple):
+    """
+    Order as saved in orders file. Items (item ID -> quantity) are the stored dict itself, shared with cached records
+    like dicts returned by BaseClass.read, so they must not be changed.
+    """
+    order_id: str
+    user: str
+    items: Mapping
+    total: float
+    coupon_used: bool
+    status: str
+    date: str
+
+    @classmethod
+    def from_record(cls, order_id, record: dict) -> "OrderRecord":
+        return cls(str(order_id), str(record["user"]), record["items"], record.get("total", 0),
+                   record.get("coupon_used", False), record["status"], record.get("date"))
+
+
+class UserRecord(NamedTuple):
+    """User without password."""
+    user_id: str
+    username: str
+    email: str
+    coupon: str
+    orders: tuple
+
+    @classmethod
+    def from_record(cls, user_id, record: dict) -> "UserRecord":
+        return cls(str(user_id), record["username"], record["email"], record.get("coupon"),
+                   tuple(record.get("orders", ())))
+
+
+class CouponRecord(NamedTuple):
+    value: str
+    used: bool
+
+    @classmethod
+    def from_record(cls, value, record: dict) -> "CouponRecord":
+        return cls(str(value), record.get("used", False))
@@ -0,0 +1,87 @@
+import heapq
+from collections import Counter
+from datetime import date, timedelta
+
+from models.base_class import BaseClass
+from app_exceptions.exceptions import *
+from storage.locks import file_lock
+
+
+class Sales(BaseClass):
+    """
+    Sold quantities of items, updated whenever an order is saved or removed.
+    Record 'total' holds quantities of all orders and one record per day ('YYYY-MM-DD') holds quantities
+    of orders made that day, both as item ID -> quantity.
+    """
+    filename = "files/sales.txt"
+    total_key = "total"
+
+    @classmethod
+    def add(cls, sold: dict, removed=False) -> None:
+        """
+        Add (or subtract) sold quantities to the counters.
+        If sales file does not exist yet, nothing is changed, because counters are built from orders when first needed.
+        Param sold: dict, day ('YYYY-MM-DD', or None if not known) -> {item ID: quantity}.
+        Param removed: bool, True if quantities belong to removed order.
+        Return: None.
+        """
+        try:
+            with cls.transaction(cls.filename) as sales:
+                for day, items in sold.items():
+                    for key in (cls.total_key, day) if day else (cls.total_key,):
+                        counters = sales.setdefault(key, {})
+                        for item_id, quantity in items.items():
+                            count = counters.get(str(item_id), 0) + (-quantity if removed else quantity)
+                            if count > 0:
+                                counters[str(item_id)] = count
+                            else:
+                                counters.pop(str(item_id), None)
+                        if not counters:
+                            sales.pop(key)
+        except InitializeFileError:
+            pass
+
+    @classmethod
+    def counters(cls) -> dict:
+        """
+        Get all counters, building them from orders if sales file does not exist yet.
+        Return: dict.
+        """
+        try:
+            return cls.read(cls.filename)
+        except InitializeFileError:
+            return cls.rebuild()
+
+    @classmethod
+    def rebuild(cls) -> dict:
+        """
+        Count sold quantities of all saved orders again, summed over shards of orders by sharded_reports.
+        Orders file is locked for reading meanwhile, so no order is saved before the counters are.
+        Return: dict with new counters.
+        """
+        from models.orders import Order  # orders module imports Sales
+        from sharded_reports import order_totals  # process pool is loaded only for reports
+        with file_lock(Order.filename, shared=True), cls.transaction(cls.filename, create=True) as sales:
+            sales.clear()
+            cls.add(order_totals().sold)
+        return sales
+
+    @classmethod
+    def top_items(cls, count: int = 3, days: int = None, today: date = None) -> list:
+        """
+        Get most sold items, using a heap over item counters instead of sorting all orders.
+        Items with equal quantity keep the order in which they were first sold.
+        Param count: number of items, int.
+        Param days: count only orders of last days (today included), or None for all orders.
+        Param today: last day of the period, date, default today.
+        Return: list of (item ID, quantity) tuples, most sold first.
+        """
+        sales = cls.counters()
+        if days is None:
+            totals = sales.get(cls.total_key, {})
+        else:
+            today = today or date.today()
+            totals = Counter()
+            for offset in range(days - 1, -1, -1):
+                totals.update(sales.get((today - timedelta(days=offset)).isoformat(), {}))
+        return heapq.nlargest(count, totals.items(), key=lambda sold: sold[1])
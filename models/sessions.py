@@ -0,0 +1,167 @@
+"""
+Sessions of logged-in users for front ends that serve many requests, like services.api.
+A session keeps user's profile (username, admin status, coupon state and open orders) between requests,
+so requests do not create User objects and scan orders again. Sessions expire after SESSION_TTL seconds
+without use, and least recently used sessions are dropped when there are more than SESSION_MAX of them.
+Every use of a session is checked against the users file, so locking the user or changing the password ends the
+session in every process, and the cached profile is loaded again when users, orders or coupons files changed.
+Model methods that change a user's orders or coupon also invalidate the cached profile in this process right away.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SESSION_TTL = float(os.getenv("SESSION_TTL", 1800))
+SESSION_MAX = int(os.getenv("SESSION_MAX", 10000))
+
+
+class Session:
+    """One logged-in user. Profile is None when it has to be loaded again."""
+    __slots__ = ("token", "user_id", "admin", "cart", "profile", "version", "expires", "credentials", "signature")
+
+    def __init__(self, token: str, user_id: str, admin: bool, profile: dict, expires: float,
+                 credentials: str = None, signature: tuple = None):
+        self.token = token
+        self.user_id = user_id
+        self.admin = admin
+        self.cart = {}
+        self.profile = profile
+        self.version = 0
+        self.expires = expires
+        self.credentials = credentials  # fingerprint of user's password at login
+        self.signature = signature  # storage signatures of files the profile was loaded from
+
+
+class SessionStore:
+    """Sessions by token, in order of last use, safe to use from several threads."""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = SESSION_MAX, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.__sessions = OrderedDict()
+        self.__tokens = defaultdict(set)  # user ID -> tokens of the user's sessions
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__sessions)
+
+    def __drop(self, token: str) -> None:
+        session = self.__sessions.pop(token)
+        tokens = self.__tokens[session.user_id]
+        tokens.discard(token)
+        if not tokens:
+            del self.__tokens[session.user_id]
+
+    def login(self, email: str, password: str) -> Session:
+        """
+        Check credentials and start a new session.
+        Param email: users email, str.
+        Param password: users password, str.
+        Return: Session. Raises AuthenticationException if credentials are not valid.
+        """
+        from models.users import User  # users module imports sessions
+        user_id = User.authenticate(email, password)
+        signature = User.profile_signature()
+        profile = User.profile(user_id)
+        now = self.clock()
+        session = Session(uuid.uuid4().hex, user_id, profile["admin"], profile, now + self.ttl,
+                          User.credentials(user_id), signature)
+        with self.__lock:
+            # Sessions are kept in order of last use, so expired ones are at the front.
+            while self.__sessions and next(iter(self.__sessions.values())).expires <= now:
+                self.__drop(next(iter(self.__sessions)))
+            self.__sessions[session.token] = session
+            self.__tokens[user_id].add(session.token)
+            while len(self.__sessions) > self.max_sessions:
+                self.__drop(next(iter(self.__sessions)))
+        return session
+
+    def get(self, token: str):
+        """
+        Get session of the token and extend its time to live.
+        User's password in the users file is checked too, so the session ends when the user was locked or the password
+        was changed, also by another process.
+        Param token: session token, str.
+        Return: Session, or None if there is no such session, it has expired or user's credentials changed.
+        """
+        from models.users import User  # users module imports sessions
+        now = self.clock()
+        with self.__lock:
+            session = self.__sessions.get(token)
+            if session is None:
+                return None
+            if session.expires <= now:
+                self.__drop(token)
+                return None
+        if User.credentials(session.user_id) != session.credentials:
+            self.logout(token)
+            return None
+        with self.__lock:
+            if token not in self.__sessions:
+                return None
+            session.expires = now + self.ttl
+            self.__sessions.move_to_end(token)
+            return session
+
+    def profile(self, session: Session) -> dict:
+        """
+        Get profile of the session's user, loading it from files if it was invalidated or the files changed since.
+        Param session: Session.
+        Return: dict.
+        """
+        from models.users import User  # users module imports sessions
+        # Signature is taken before loading, so changes written during the load make the next call load again.
+        signature = User.profile_signature()
+        with self.__lock:
+            profile, version = session.profile, session.version
+            if profile is not None and session.signature == signature:
+                return profile
+        profile = User.profile(session.user_id)
+        with self.__lock:
+            # Profile invalidated while it was loading may be already stale, so it is not kept.
+            if session.version == version:
+                session.profile = profile
+                session.signature = signature
+        return profile
+
+    def invalidate(self, user_id) -> None:
+        """
+        Drop cached profile of user's sessions, after user's orders or coupon changed.
+        Param user_id: user ID.
+        Return: None.
+        """
+        with self.__lock:
+            for token in self.__tokens.get(str(user_id), ()):
+                session = self.__sessions[token]
+                session.profile = None
+                session.version += 1
+
+    def revoke(self, user_id) -> None:
+        """
+        End all sessions of the user.
+        Param user_id: user ID.
+        Return: None.
+        """
+        with self.__lock:
+            for token in list(self.__tokens.get(str(user_id), ())):
+                self.__drop(token)
+
+    def logout(self, token: str) -> None:
+        """
+        End one session.
+        Param token: session token, str.
+        Return: None.
+        """
+        with self.__lock:
+            if token in self.__sessions:
+                self.__drop(token)
+
+
+sessions = SessionStore()
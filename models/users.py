@@ -1,16 +1,19 @@
+import hashlib
 import os
+import sqlite3
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from collections import defaultdict
 from typing import Union
 
 from dotenv import load_dotenv
-from email_validator import validate_email, EmailNotValidError
 
 from models.base_class import BaseClass
+from models.records import UserRecord, CouponRecord
 from models.coupons import Coupon
 from models.items import Item
-from models.orders import Order, WHOLESALE_MINIMUM
+from models.orders import Order
+from models.sessions import sessions
 from app_exceptions.exceptions import *
 from utils import mprint, create_excel_file
 
@@ -26,6 +29,8 @@ class User(BaseClass):
     """Model for User"""
     total_objects = None
     filename = "files/users.txt"
+    record_type = UserRecord
+    email_index_filename = "files/email_index.txt"
     admin_credentials = {ADMIN1: PASSWORD1, ADMIN2: PASSWORD2}
 
     def __init__(self, username, email, password, user_id=None):
@@ -37,7 +42,7 @@ class User(BaseClass):
         self.__coupon = None
         self.__admin_status = None
         self.order = None
-        self.saved_orders = self.load_my_saved_orders()
+        self.__saved_orders = None
         if not self.is_registered_email(email):
             self.record_user(self.username, self.email, self.password)
 
@@ -65,6 +70,13 @@ class User(BaseClass):
     def coupon(self, value):
         self.__coupon = value
 
+    @property
+    def saved_orders(self) -> list:
+        """Users unpaid orders, loaded from file on first access."""
+        if self.__saved_orders is None:
+            self.__saved_orders = self.load_my_saved_orders()
+        return self.__saved_orders
+
     @property
     def admin_status(self):
         return self.__admin_status
@@ -80,13 +92,22 @@ class User(BaseClass):
         Loads saved orders User have in a file.
         :return: list of orders.
         """
-        orders = Order.read(Order.filename)
+        orders = Order.find(Order.filename, user=self.id)
         my_unpaid_orders = []
         for order in orders:
-            if orders[order]["user"] == self.id and orders[order]["status"] != "paid":
+            if orders[order]["status"] != "paid":
                 my_unpaid_orders.append(Order.create_order_object(order))
         return my_unpaid_orders
 
+    @classmethod
+    def get_usernames(cls) -> dict:
+        """
+        Get usernames of all users without creating User instances.
+        Return: dict, user ID -> username.
+        """
+        users = cls.read(cls.filename)
+        return {user_id: user["username"] for user_id, user in users.items()}
+
     @classmethod
     def create_user_object(cls, user_id) -> "User":
         """
@@ -114,7 +135,59 @@ class User(BaseClass):
         Validate admin user.
         :return: bool.
         """
-        return any(self.username == key and self.password == value for key, value in self.admin_credentials.items())
+        return self.has_admin_credentials(self.username, self.password)
+
+    @classmethod
+    def has_admin_credentials(cls, username: str, password: str) -> bool:
+        """
+        Check if username and password belong to one of the admins.
+        :return: bool.
+        """
+        return any(username == key and password == value for key, value in cls.admin_credentials.items())
+
+    @classmethod
+    def credentials(cls, user_id):
+        """
+        Fingerprint of user's stored password, which changes when the password is changed or the user is locked.
+        Param user_id: user ID.
+        Return: str, or None if there is no such user.
+        """
+        user = cls.read(cls.filename).get(str(user_id))
+        if user is None:
+            return None
+        return hashlib.sha256(str(user.get("password")).encode()).hexdigest()
+
+    @classmethod
+    def profile_signature(cls) -> tuple:
+        """
+        Storage signatures of files that profiles are loaded from, they change whenever any profile may change.
+        Return: tuple.
+        """
+        return tuple(cls.storage.signature(filename) for filename in (cls.filename, Order.filename, Coupon.filename))
+
+    @classmethod
+    def profile(cls, user_id) -> dict:
+        """
+        Load user's profile from files, without creating User and Order objects.
+        Param user_id: user ID.
+        Return: dict with user_id, username, email, admin, coupon, coupon_used and open_orders (IDs of unpaid orders).
+        """
+        user_id = str(user_id)
+        users = cls.read(cls.filename)
+        if user_id not in users:
+            raise NonExistingUserException
+        user = users[user_id]
+        coupon = Coupon.read(Coupon.filename).get(user["coupon"], {})
+        orders = Order.find(Order.filename, user=user_id)
+        return {
+            "user_id": user_id,
+            "username": user["username"],
+            "email": user["email"],
+            "admin": cls.has_admin_credentials(user["username"], user["password"]),
+            "coupon": user["coupon"],
+            "coupon_used": coupon.get("used", False),
+            "open_orders": [order_id for order_id, order in orders.items() if order["status"] != "paid"],
+        }
 
     @classmethod
     def is_registered_email(cls, email: str) -> bool:
@@ -124,16 +197,55 @@ class User(BaseClass):
         :return: bool
         """
         try:
-            users = cls.read(cls.filename)
-            for user in users:
-                if users[user]["email"] == email:
-                    return True
+            if cls.normalize_email(email) in cls.get_email_index():
+                return True
         except OrderAPPException as e:
             mprint(e.__str__())
         return False
 
+    @staticmethod
+    def normalize_email(email: str) -> str:
+        """
+        Normalize email for index lookups, so the same address is found regardless of letter case.
+        :param email: str, users email.
+        :return: str.
+        """
+        return email.strip().lower()
+
+    @classmethod
+    def get_email_index(cls) -> dict:
+        """
+        Get index of registered emails. Index is built from users file if it does not exist yet,
+        after that it is maintained by record_user and lock_user.
+        :return: dict, normalized email -> user ID.
+        """
+        users = cls.read(cls.filename)
+        try:
+            index = cls.read(cls.email_index_filename)
+        except InitializeFileError:
+            index = {}
+        if users and not index:
+            with cls.transaction(cls.email_index_filename, create=True) as index:
+                if not index:
+                    index.update({cls.normalize_email(user["email"]): user_id for user_id, user in users.items()})
+        return index
+
+    @classmethod
+    def index_email(cls, email: str, user_id) -> None:
+        """
+        Add or refresh users email in email index.
+        :param email: str, users email.
+        :param user_id: users ID.
+        :return: None.
+        """
+        cls.get_email_index()
+        with cls.transaction(cls.email_index_filename, create=True) as index:
+            index[cls.normalize_email(email)] = str(user_id)
+
     @staticmethod
     def validate_email(email) -> bool:
+        from email_validator import validate_email, EmailNotValidError  # imported on use, slow to load
+
         try:
             valid = validate_email(email)
             return valid.email
@@ -191,7 +303,7 @@ class User(BaseClass):
         :return: User instance.
         """
         try:
-            users = cls.read(cls.filename)
+            cls.read(cls.filename)
         except OrderAPPException as e:
             mprint(e.__str__())
             return
@@ -202,14 +314,52 @@ class User(BaseClass):
             password = input("Enter password or 'q' for quit >> ")
             if password.lower() == 'q':
                 return
-            for user in users:
-                if users[user].get("email") == email and users[user].get("password") == password:
-                    mprint(f"Successfully logged in. Welcome {users[user]['username']} ♫ ♪ ")
-                    try:
-                        return cls.create_user_object(user)
-                    except OrderAPPException as e:
-                        mprint(e.__str__())
-            mprint("Not valid credentials. ☻")
+            try:
+                user = cls.authenticate(email, password)
+            except OrderAPPException as e:
+                mprint(e.__str__())
+                continue
+            mprint(f"Successfully logged in. Welcome {cls.read(cls.filename)[user]['username']} ♫ ♪ ")
+            try:
+                return cls.create_user_object(user)
+            except OrderAPPException as e:
+                mprint(e.__str__())
+            mprint(AuthenticationException().__str__())
+
+    @classmethod
+    def authenticate(cls, email: str, password: str) -> str:
+        """
+        Check user's credentials without asking for input.
+        Param email: users email, str.
+        Param password: users password, str.
+        Return: user ID, str. Raises AuthenticationException if credentials are not valid.
+        """
+        user = cls.get_email_index().get(cls.normalize_email(email))
+        users = cls.read(cls.filename)
+        if user in users and users[user].get("password") == password:
+            return user
+        raise AuthenticationException
+
+    @classmethod
+    def create_account(cls, username: str, email: str, password: str) -> str:
+        """
+        Create User account without asking for input.
+        Param username: users username, str.
+        Param email: users email, str.
+        Param password: users password, str.
+        Return: ID of new user, str. Raises OrderAPPException if account cannot be created.
+        """
+        from email_validator import validate_email, EmailNotValidError  # imported on use, slow to load
+
+        if not username or not password:
+            raise OrderAPPException("Username and password are required.")
+        try:
+            validate_email(email)
+        except EmailNotValidError as e:
+            raise OrderAPPException(e.__str__()) from e
+        if cls.is_registered_email(email):
+            raise OrderAPPException(f"{email} already registered.")
+        return str(User(username, email, password).id)
 
     def refresh_base(self) -> None:
         """
@@ -235,24 +385,24 @@ class User(BaseClass):
         :param admin: bool, True if user is admin.
         :return: None.
         """
-        users = self.read(self.filename)
-        while str(self.total_objects) in users:
-            self.total_objects += 1
-        user_id = self.total_objects
+        user_id = self.next_id()
         self.__id = user_id
         try:
-            users = self.read(self.filename)
             coupon = Coupon()
-            users[user_id] = {"username": username,
-                              "email": email,
-                              "password": password,
-                              "orders": [],
-                              "coupon": coupon.value}
-            self.write(users, self.filename)
+            with self.transaction(self.filename) as users:
+                users[user_id] = {"username": username,
+                                  "email": email,
+                                  "password": password,
+                                  "orders": [],
+                                  "coupon": coupon.value}
+            self.index_email(email, user_id)
             if not admin:
                 mprint(f"\t{username} registered!")
         except OrderAPPException as e:
             mprint(e.__str__())
+        except sqlite3.IntegrityError as e:
+            # Same email registered at the same time by another request, rejected by sqlite backend's unique index.
+            raise OrderAPPException(f"{email} already registered.") from e
 
     def show_coupon(self) -> None:
         """
@@ -262,8 +412,8 @@ class User(BaseClass):
         try:
             coupons = Coupon.read(Coupon.filename)
             if self.coupon in coupons:
-                coupon = Coupon.create_coupon_object(self.coupon)
-                if coupon.is_used:
+                coupon = CouponRecord.from_record(self.coupon, coupons[self.coupon])
+                if coupon.used:
                     mprint("You have used your coupon.")
                 else:
                     mprint(f"Your can still use your coupon: {coupon.value}")
@@ -364,18 +514,22 @@ class User(BaseClass):
         :return: None.
         """
         if self.order:
-            users = self.read(self.filename)
-            if self.user_wants_coupon_discount():
-                self.order.record_order(apply_coupon=True)
-                coupon = Coupon.create_coupon_object(self.coupon)
-                coupon.use_coupon()
-            else:
-                self.order.record_order()
-            self.saved_orders.append(self.order)
-            users[self.id]["orders"].append(self.order.order_id)
+            try:
+                if self.user_wants_coupon_discount():
+                    self.order.record_order(apply_coupon=True)
+                    coupon = Coupon.create_coupon_object(self.coupon)
+                    coupon.use_coupon()
+                else:
+                    self.order.record_order()
+            except OrderAPPException as e:
+                return mprint(e.__str__())
+            if self.__saved_orders is not None:
+                self.__saved_orders.append(self.order)
+            with self.transaction(self.filename) as users:
+                users[self.id]["orders"].append(self.order.order_id)
+            sessions.invalidate(self.id)
             mprint(f"Order {self.order.order_id} saved.", "Go to payments section ☻")
             self.order = None
-            self.write(users, self.filename)
         else:
             mprint("You have no active orders. ♫")
 
@@ -385,7 +539,6 @@ class User(BaseClass):
         :param order_id: str, Order ID
         :return: None.
         """
-        users = self.read(self.filename)
         try:
             order = Order.create_order_object(str(order_id))
         except OrderAPPException as e:
@@ -396,8 +549,8 @@ class User(BaseClass):
                 Coupon.refund_coupon(self.coupon)
             except OrderAPPException as e:
                 mprint(e.__str__())
-        users[self.id]["orders"].remove(order_id)
-        self.write(users, self.filename)
+        with self.transaction(self.filename) as users:
+            users[self.id]["orders"].remove(order_id)
 
     def show_my_saved_orders(self) -> bool:
         """
@@ -445,6 +598,7 @@ class User(BaseClass):
                         self.update_user_orders(order.order_id)
                         Order.remove(order.order_id)
                         self.saved_orders.remove(order)
+                        sessions.invalidate(self.id)
         else:
             mprint("You have no saved orders. ☻")
 
@@ -479,21 +633,19 @@ class User(BaseClass):
         print(f"Registered Customer: {self.username}")
         print(f"Date: {now.strftime('%d/%m/%Y')} | Time: {now.strftime('%H:%M:%S')}")
         print(f"{'EUR': >80}")
-        for item in order.items:
-            product = Item.create_item_object(item)
-            qty = order.items[item]
-            price = round(product.price * qty, 2)
-            length = 76 - len(product.name) - len(str(price))
+        for name, _, qty, price in order.get_lines().values():
+            length = 76 - len(name) - len(str(price))
             line = " " * length
-            mprint(f"{product.name} x {qty}{line}{price}", delimiter=".")
-        if order.coupon_used:
-            print(f"Total: {order.get_total_price():>73}")
+            mprint(f"{name} x {qty}{line}{price}", delimiter=".")
+        subtotal, discount, total = order.price_summary()
+        if discount == "coupon":
+            print(f"Total: {subtotal:>73}")
             print("Coupon discount 5% used for this order.")
-            mprint(f"New Total: {order.get_total_price() * 0.95:>69.2f}")
-        elif order.get_total_price() > WHOLESALE_MINIMUM:
-            print(f"Total: {order.get_total_price():>73}")
+            mprint(f"New Total: {total:>69.2f}")
+        elif discount == "wholesale":
+            print(f"Total: {subtotal:>73}")
             print("Wholesale discount (15%) will be applied on total amount.")
-            mprint(f"New Total: {order.get_total_price() * 0.85:>69.2f}")
+            mprint(f"New Total: {total:>69.2f}")
         input("Press any key to continue >> ")
 
     def go_to_payments(self) -> None:
@@ -505,10 +657,10 @@ class User(BaseClass):
         order_id = self.choose_saved_order()
         if not order_id:
             return
-        orders = Order.read(Order.filename)
         try:
-            orders[order_id]["status"] = "paid"
-            Order.write(orders, Order.filename)
+            with Order.transaction(Order.filename) as orders:
+                orders[order_id]["status"] = "paid"
+            sessions.invalidate(self.id)
             mprint(f"You have paid your order: {order_id}. ☻")
             self.print_my_receipt(order_id)
             for order in self.saved_orders:
@@ -526,15 +678,20 @@ class User(BaseClass):
             raise AdminStatusException
         orders = Order.read(Order.filename)
         if orders:
+            usernames = self.get_usernames()
+            products = Item.read(Item.filename)
             mprint("Made orders:", delimiter=" ")
-            for order in orders:
+            for order in orders.values():
                 try:
-                    user = self.create_user_object(orders[order]["user"])
-                    print(f"User '{user.username}' ordered:")
-                    for item_code, quantity in orders[order]["items"].items():
-                        item = Item.create_item_object(item_code)
-                        print(f"{item.name} x {quantity}")
-                    mprint(f"Total: {orders[order]['total']:.2f} EUR", delimiter="_")
+                    username = usernames.get(str(order["user"]))
+                    if username is None:
+                        raise NonExistingUserException
+                    print(f"User '{username}' ordered:")
+                    for item_code, quantity in order["items"].items():
+                        if item_code not in products:
+                            raise NonExistingItemException
+                        print(f"{products[item_code]['name']} x {quantity}")
+                    mprint(f"Total: {order['total']:.2f} EUR", delimiter="_")
                 except OrderAPPException as e:
                     mprint(e.__str__())
         else:
@@ -547,8 +704,8 @@ class User(BaseClass):
         """
         if not self.admin_status:
             raise AdminStatusException
-        orders = Order.read(Order.filename)
-        total = sum(orders[order].get("total", 0) for order in orders)
+        from sharded_reports import order_totals  # process pool is loaded only for reports
+        total = order_totals().brutto
         mprint(f"Brutto of all orders is {total:.2f} EUR.")
 
     def get_total_money_paid(self):
@@ -558,8 +715,8 @@ class User(BaseClass):
         """
         if not self.admin_status:
             raise AdminStatusException
-        orders = Order.read(Order.filename)
-        total = sum(orders[order].get("total", 0) for order in orders if orders[order]["status"] == "paid")
+        from sharded_reports import order_totals  # process pool is loaded only for reports
+        total = order_totals().paid
         mprint(f"Brutto money paid: {total:.2f} EUR.")
 
     def get_used_coupons(self) -> None:
@@ -569,15 +726,15 @@ class User(BaseClass):
         """
         if not self.admin_status:
             raise AdminStatusException
-        coupons = Coupon.read(Coupon.filename)
-        used_coupons = [coupon for coupon in coupons if coupons[coupon].get("used")]
         users = self.read(self.filename)
-        users_with_used_coupon = [(users[user]["username"], users[user]["coupon"]) for user in users if
-                                  users[user]["coupon"] in used_coupons]
-
-        for username, coupon in users_with_used_coupon:
-            mprint(f"User {username} used coupon: {coupon}", delimiter="_")
-        if not used_coupons:
+        used_coupons = Coupon.get_coupons(used=True)
+        user_count = 0
+        for user in users:
+            coupon_id = users[user].get("coupon")
+            if coupon_id in used_coupons:
+                mprint(f"User {users[user]['username']} used coupon: {coupon_id}", delimiter="_")
+                user_count += 1
+        if not user_count:
             mprint("There is no users with used coupons. ♫")
 
     def get_users_with_active_coupons(self) -> None:
@@ -588,25 +745,79 @@ class User(BaseClass):
         if not self.admin_status:
             raise AdminStatusException
         users = self.read(self.filename)
+        active_coupons = Coupon.get_coupons(used=False)
         user_count = 0
         for user in users:
             coupon_id = users[user].get("coupon")
-            coupon = Coupon.create_coupon_object(coupon_id)
-            if not coupon.is_used:
-                mprint(f"{users[user]['username']} has active coupon {coupon.value}", delimiter=".")
+            if coupon_id in active_coupons:
+                mprint(f"{users[user]['username']} has active coupon {coupon_id}", delimiter=".")
                 user_count += 1
         if not user_count:
             mprint("There is no users with active coupons. ♫")
 
+    def get_revenue_reports(self) -> None:
+        """
+        Admin Option. Prints revenue by day, by user and by item.
+        :return: None.
+        """
+        if not self.admin_status:
+            raise AdminStatusException
+        from reports import OrderReports  # pandas is loaded only for reports
+        from sharded_reports import order_totals  # process pool is loaded only for reports
+        reports = OrderReports.load()
+        mprint("Revenue by day:", delimiter="_")
+        for day, total in reports.revenue_by_day().items():
+            print(f"{day} | {total:.2f} EUR")
+        mprint("Revenue by user:", delimiter="_")
+        usernames = self.get_usernames()
+        for user_id, orders, total in order_totals().revenue_by_user():
+            print(f"{usernames.get(user_id)} | orders: {orders} | {total:.2f} EUR")
+        mprint("Revenue by product (without discounts):", delimiter="_")
+        for _, name, quantity, revenue in reports.revenue_by_item().itertuples(index=False):
+            print(f"{name} | sold: {quantity} pieces | {revenue:.2f} EUR")
+
+    def export_orders(self) -> None:
+        """
+        Admin Option. Export orders made in a date range to Excel or csv file.
+        :return: None.
+        """
+        if not self.admin_status:
+            raise AdminStatusException
+        from exports import export_orders, FORMATS  # exports module imports User
+        days = []
+        for prompt in ("First day", "Last day"):
+            while True:
+                day = input(f"{prompt} (YYYY-MM-DD) or Enter for no limit >> ").strip()
+                try:
+                    days.append(date.fromisoformat(day) if day else None)
+                    break
+                except ValueError:
+                    print("Invalid date.")
+        file_format = input(f"File format {'/'.join(FORMATS)} (Enter for {FORMATS[0]}) >> ").strip().lower()
+        while file_format and file_format not in FORMATS:
+            file_format = input(f"Invalid format. Choose {'/'.join(FORMATS)} >> ").strip().lower()
+        try:
+            path, rows = export_orders(*days, file_format=file_format or FORMATS[0])
+        except OrderAPPException as e:
+            return mprint(e.__str__())
+        mprint(f"Exported {rows} order lines to {path} ♫")
+
     def get_popular_items(self) -> None:
         """
-        Admin Option. Prints three most popular Products on stdout.
+        Admin Option. Prints most popular Products on stdout, three of all time by default.
         :return: None.
         """
-        if self.admin_status:
-            Order.get_most_popular_items()
-        else:
+        if not self.admin_status:
             raise AdminStatusException
+        numbers = []
+        for prompt, default in (("Number of products", "3"), ("Last days", "all time")):
+            while True:
+                number = input(f"{prompt} (Enter for {default}) >> ").strip()
+                if not number or number.isdigit() and int(number) > 0:
+                    numbers.append(int(number) if number else None)
+                    break
+                print("Invalid number.")
+        Order.get_most_popular_items(numbers[0] or 3, numbers[1])
 
     def update_items_count(self) -> None:
         """
@@ -615,11 +826,8 @@ class User(BaseClass):
         """
         if not self.admin_status:
             raise AdminStatusException
-        items = Item.read(Item.filename)
-        for item in items:
-            item_object = Item.create_item_object(item)
-            print(f"ID: {item_object.item_id} | Product: {item_object.name} | price: {item_object.price} |"
-                  f" on stock: {item_object.stock}")
+        for item in Item.records():
+            print(f"ID: {item.item_id} | Product: {item.name} | price: {item.price} | on stock: {item.stock}")
         new_values = Item.select_item()
         if not new_values:
             return
@@ -636,11 +844,9 @@ class User(BaseClass):
         """
         if not self.admin_status:
             raise AdminStatusException
-        items = Item.read(Item.filename)
-        for item in items:
-            item_object = Item.create_item_object(item)
-            print(f"ID: {item_object.item_id} | Product: {item_object.name} | price: {item_object.price} |"
-                  f" on stock: {item_object.stock}")
+        items = {item.item_id: item for item in Item.records()}
+        for item in items.values():
+            print(f"ID: {item.item_id} | Product: {item.name} | price: {item.price} | on stock: {item.stock}")
         item_id = input("Enter Product`s ID you want to delete or 'q' to quit >> ")
         if item_id.lower() == 'q':
             return
@@ -648,7 +854,7 @@ class User(BaseClass):
             item_id = input("Invalid ID. Enter Product`s ID you want to delete or 'q' to quit >> ")
             if item_id.lower() == 'q':
                 return
-        product = Item.create_item_object(item_id)
+        product = items[item_id]
         confirm = input(f"Are you sure you want to delete {product.name}? Y/N >>")
         while confirm.lower() not in ('y', 'n'):
             confirm = input(f"Enter Y for YES or N for NO. Are you sure you want to delete {product.name}? Y/N >> ")
@@ -699,14 +905,15 @@ class User(BaseClass):
         try:
             users = self.read(self.filename)
             for user in users:
-                user_obj = User.create_user_object(user)
-                print(f"User ID: {user_obj.id} | {user_obj.username}")
+                print(f"User ID: {user} | {users[user]['username']}")
             user_id = self.select_user_id(users)
             if not user_id:
                 return mprint("Going back...")
             new_pass = "password" if reverse else str(uuid.uuid4())
-            users[user_id]['password'] = new_pass
-            self.write(users, self.filename)
+            with self.transaction(self.filename) as users:
+                users[user_id]['password'] = new_pass
+            sessions.revoke(user_id)
+            self.index_email(users[user_id]["email"], user_id)
             mprint(f"{users[user_id]['username']} {'un' if reverse else ''}locked! New Password set to: {new_pass}")
         except OrderAPPException as e:
             mprint(e.__str__())
@@ -777,13 +984,13 @@ class User(BaseClass):
             total = orders[order_id].get("total")
             now = datetime.now()
             frame = []
-            for key, value in order.items.items():
-                item = Item.create_item_object(key)
-                frame.append([item.item_id, item.name, item.price, value, round(item.price * value, 2)])
+            for key, (name, price, value, line_total) in order.get_lines().items():
+                frame.append([key, name, price, value, line_total])
             frame.append([])
-            if not order.coupon_used and order.get_total_price() > WHOLESALE_MINIMUM:
+            discount = order.price_summary()[1]
+            if discount == "wholesale":
                 frame.append(["Applied: ", "Wholesale discount (15%)", "", "Sum", str(total)])
-            elif order.coupon_used:
+            elif discount == "coupon":
                 frame.append(["Applied: ", "Coupon discount (5%)", "", "Sum", str(total)])
             else:
                 frame.append(["", "", "", "Sum", str(total)])
@@ -794,10 +1001,10 @@ class User(BaseClass):
                           ["Time", f"{now.strftime('%H:%M:%S')}", "", "", ""])
                          )
             try:
-                create_excel_file(frame, order_id)
+                path = create_excel_file(frame, order_id)
             except OrderAPPException as e:
-                mprint(e.__str__())
-            mprint("Look for your file in main Folder ♫")
+                return mprint(e.__str__())
+            mprint(f"Look for your file: {path} ♫")
         elif order_id == "No Orders":
             mprint("You have not made any orders yet ☻")
         else:
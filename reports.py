@@ -0,0 +1,71 @@
+"""Admin reports computed with pandas over orders and items loaded once."""
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from models.items import Item
+from models.orders import Order
+
+
+class OrderReports:
+    """
+    Columnar snapshot of all records used for admin reports.
+    orders: one row per order, lines: one row per ordered item, items: one row per record.
+    """
+
+    def __init__(self, orders: pd.DataFrame, lines: pd.DataFrame, items: pd.DataFrame):
+        self.orders = orders
+        self.lines = lines
+        self.items = items
+
+    @classmethod
+    def load(cls) -> "OrderReports":
+        """
+        Read all files once and build frames. Order columns are built column by column, not row by row.
+        :return: OrderReports instance.
+        """
+        orders = Order.read(Order.filename)
+        items = Item.read(Item.filename)
+
+        order_ids = np.array(list(orders), dtype=object)
+        records = pd.DataFrame.from_records(list(orders.values()),
+                                            columns=["user", "items", "total", "status", "coupon_used", "date"])
+        orders_frame = pd.DataFrame({
+            "order_id": order_ids,
+            "user_id": records["user"].astype(str),
+            "total": records["total"].fillna(0),
+            "status": records["status"],
+            "coupon_used": records["coupon_used"].fillna(False).astype(bool),
+            "date": pd.to_datetime(records["date"]),
+        })
+        ordered = records["items"].tolist()
+        lines_frame = pd.DataFrame({
+            "order_id": np.repeat(order_ids, np.fromiter(map(len, ordered), dtype=np.int64, count=len(ordered))),
+            "item_id": list(chain.from_iterable(ordered)),
+            "quantity": np.fromiter(chain.from_iterable(map(dict.values, ordered)), dtype=np.int64),
+        })
+        products = list(items.values())
+        if Item.stock_table is not None:
+            products = [Item.live_product(item_id, item) for item_id, item in items.items()]
+        items_frame = pd.DataFrame.from_records(products, columns=["name", "price", "stock"])
+        items_frame.insert(0, "item_id", list(items))
+        return cls(orders_frame, lines_frame, items_frame)
+
+    def revenue_by_day(self) -> pd.Series:
+        """
+        Total amount of orders per day. Orders saved without date are left out.
+        :return: Series indexed by date.
+        """
+        dated = self.orders.dropna(subset=["date"])
+        return dated.groupby(dated["date"].dt.date)["total"].sum()
+
+    def revenue_by_item(self) -> pd.DataFrame:
+        """
+        Sold pieces and their value by current item prices (before discounts), largest first.
+        :return: frame with item_id, name, quantity and revenue.
+        """
+        lines = self.lines.merge(self.items[["item_id", "name", "price"]], on="item_id", how="left")
+        lines["revenue"] = lines["quantity"] * lines["price"]
+        per_item = lines.groupby(["item_id", "name"], dropna=False)[["quantity", "revenue"]].sum().reset_index()
+        return per_item.sort_values("revenue", ascending=False)
@@ -0,0 +1,429 @@
+"""
+HTTP/JSON service for the order models, serving many clients from one process.
+Command: python -m services.api [--host HOST] [--port PORT] [--workers N]
+Requests and responses are json. Login returns a token, which later requests send as 'Authorization: Bearer <token>'.
+
+    POST   /register             {"username": ..., "email": ..., "password": ...}
+    POST   /login                {"email": ..., "password": ...}
+    POST   /logout
+    GET    /me                   profile: coupon state and open orders
+    GET    /items                ?query=text&page=1&page_size=100
+    GET    /cart
+    POST   /cart                 {"items": {"1": 2}} adds items to the cart
+    DELETE /cart
+    GET    /orders
+    POST   /orders               {"coupon": ...} places the cart, or {"items": {...}, "coupon": ...}
+    DELETE /orders/<id>          cancels unpaid order
+    POST   /orders/<id>/pay
+    GET    /admin/reports        ?count=3&days=30
+
+Model calls block on files, so they run in a thread pool while the event loop keeps serving other connections.
+Requests that change a file run one at a time on it, requests that only read it run together.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import traceback
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+from dotenv import load_dotenv
+
+from models.base_class import BaseClass
+from models.coupons import Coupon
+from models.items import Item, CATALOG_PAGE_SIZE
+from models.orders import Order
+from models.sales import Sales
+from models.sessions import sessions
+from models.users import User
+from app_exceptions.exceptions import *
+from services.orders import place_order, cancel_order, pay_order
+
+load_dotenv()
+
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", 8080))
+API_WORKERS = int(os.getenv("API_WORKERS", 16))
+MAX_BODY = 1024 * 1024
+ERROR_STATUS = (
+    (AuthenticationException, HTTPStatus.UNAUTHORIZED),
+    (AdminStatusException, HTTPStatus.FORBIDDEN),
+    ((NonExistingUserException, NonExistingItemException, NonExistingOrderException), HTTPStatus.NOT_FOUND),
+    (InsufficientStockException, HTTPStatus.CONFLICT),
+    (InitializeFileError, HTTPStatus.SERVICE_UNAVAILABLE),
+)
+
+USERS = User.filename
+EMAILS = User.email_index_filename
+ITEMS = Item.filename
+ORDERS = Order.filename
+COUPONS = Coupon.filename
+SALES = Sales.filename
+SEQUENCES = BaseClass.sequences_filename
+
+
+class FileLocks:
+    """
+    Readers-writer locks of storage files for requests served by one event loop.
+    All files of a request are taken at once, so requests cannot deadlock, and readers wait
+    for writers that are already waiting, so a steady stream of readers does not starve them.
+    """
+
+    def __init__(self):
+        self.__condition = asyncio.Condition()
+        self.__readers = defaultdict(int)
+        self.__writing = set()
+        self.__waiting = defaultdict(int)
+
+    def __free(self, reads: set, writes: set) -> bool:
+        return (not any(name in self.__writing or self.__waiting[name] for name in reads)
+                and not any(name in self.__writing or self.__readers[name] for name in writes))
+
+    @asynccontextmanager
+    async def hold(self, reads=(), writes=()):
+        """
+        Hold files while the block runs.
+        Param reads: names of files the block only reads.
+        Param writes: names of files the block changes.
+        """
+        writes = set(writes)
+        reads = set(reads) - writes
+        async with self.__condition:
+            for name in writes:
+                self.__waiting[name] += 1
+            try:
+                await self.__condition.wait_for(lambda: self.__free(reads, writes))
+            finally:
+                for name in writes:
+                    self.__waiting[name] -= 1
+                self.__condition.notify_all()
+            self.__writing.update(writes)
+            for name in reads:
+                self.__readers[name] += 1
+        try:
+            yield
+        finally:
+            async with self.__condition:
+                self.__writing.difference_update(writes)
+                for name in reads:
+                    self.__readers[name] -= 1
+                self.__condition.notify_all()
+
+
+class Route:
+    """Endpoint: handler with the files it reads and writes."""
+
+    def __init__(self, method: str, path: str, handler, reads=(), writes=(), login=True, admin=False):
+        self.method = method
+        self.pattern = re.compile(f"^{path}$")
+        self.handler = handler
+        self.reads = reads
+        self.writes = writes
+        self.login = login
+        self.admin = admin
+
+
+class OrderAPI:
+    """
+    Handlers of the endpoints. Handlers are blocking and run in worker threads.
+    Each handler gets Session (or None), json body, query parameters and groups of the path,
+    and returns (status, payload) tuple.
+    """
+
+    def __init__(self):
+        self.routes = [
+            Route("POST", "/register", self.register, writes=(USERS, EMAILS, COUPONS, SEQUENCES), login=False),
+            Route("POST", "/login", self.login, reads=(USERS, EMAILS, COUPONS, ORDERS), login=False),
+            Route("POST", "/logout", self.logout),
+            Route("GET", "/me", self.me, reads=(USERS, COUPONS, ORDERS)),
+            Route("GET", "/items", self.items, reads=(ITEMS,), login=False),
+            Route("GET", "/cart", self.cart, reads=(ITEMS,)),
+            Route("POST", "/cart", self.add_to_cart, reads=(ITEMS,)),
+            Route("DELETE", "/cart", self.clear_cart),
+            Route("GET", "/orders", self.orders, reads=(ORDERS,)),
+            Route("POST", "/orders", self.place_order, writes=(USERS, ORDERS, ITEMS, COUPONS, SALES, SEQUENCES)),
+            Route("DELETE", r"/orders/(\d+)", self.cancel_order, writes=(USERS, ORDERS, ITEMS, COUPONS, SALES)),
+            Route("POST", r"/orders/(\d+)/pay", self.pay_order, writes=(ORDERS,)),
+            Route("GET", "/admin/reports", self.reports, reads=(USERS, ORDERS, ITEMS, COUPONS), writes=(SALES,),
+                  admin=True),
+        ]
+
+    def route(self, method: str, path: str) -> tuple:
+        """
+        Find the endpoint for a request.
+        Return: tuple with Route and groups of the path. Raises LookupError with HTTP status if there is none.
+        """
+        allowed = False
+        for route in self.routes:
+            match = route.pattern.match(path)
+            if match:
+                if route.method == method:
+                    return route, match.groups()
+                allowed = True
+        raise LookupError(HTTPStatus.METHOD_NOT_ALLOWED if allowed else HTTPStatus.NOT_FOUND)
+
+    @staticmethod
+    def session(headers: dict):
+        """
+        Session of the token from Authorization header.
+        Return: Session or None.
+        """
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer":
+            return None
+        return sessions.get(token.strip())
+
+    @staticmethod
+    def text(body: dict, field: str, default="") -> str:
+        """
+        String field of the body.
+        Return: str, or default if the field is missing or null. Raises OrderAPPException if it is not a string.
+        """
+        value = body.get(field)
+        if value is None:
+            return default
+        if not isinstance(value, str):
+            raise OrderAPPException(f"{field.capitalize()} must be a string.")
+        return value
+
+    @staticmethod
+    def quantities(body: dict) -> dict:
+        items = body.get("items")
+        if not isinstance(items, dict):
+            raise OrderAPPException("Items must be an object of item ID -> quantity.")
+        for quantity in items.values():
+            if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+                raise InvalidStockNumberException
+        return {str(item_id): quantity for item_id, quantity in items.items()}
+
+    def register(self, session, body, query):
+        user_id = User.create_account(
+            self.text(body, "username"), self.text(body, "email"), self.text(body, "password")
+        )
+        return HTTPStatus.CREATED, {"user_id": user_id}
+
+    def login(self, session, body, query):
+        session = sessions.login(self.text(body, "email"), self.text(body, "password"))
+        return HTTPStatus.OK, {"token": session.token, **session.profile}
+
+    def logout(self, session, body, query):
+        sessions.logout(session.token)
+        return HTTPStatus.OK, {}
+
+    def me(self, session, body, query):
+        return HTTPStatus.OK, sessions.profile(session)
+
+    def items(self, session, body, query):
+        try:
+            page = max(1, int(query.get("page", 1)))
+            page_size = max(1, int(query.get("page_size", CATALOG_PAGE_SIZE)))
+        except ValueError as exc:
+            raise OrderAPPException("Page and page size must be integers.") from exc
+        item_ids = Item.catalog_ids(query.get("query"))
+        products = Item.read(Item.filename)
+        return HTTPStatus.OK, {
+            "items": [{"id": item_id, **Item.live_product(item_id, products[item_id])}
+                      for item_id in item_ids[(page - 1) * page_size:page * page_size]],
+            "page": page,
+            "pages": max(1, -(-len(item_ids) // page_size)),
+        }
+
+    @staticmethod
+    def priced(order: Order) -> dict:
+        subtotal, discount, total = order.price_summary()
+        return {
+            "items": [{"id": item_id, "name": name, "price": price, "quantity": quantity, "total": line_total}
+                      for item_id, (name, price, quantity, line_total) in order.get_lines().items()],
+            "subtotal": subtotal,
+            "discount": discount,
+            "total": total,
+        }
+
+    def cart(self, session, body, query):
+        return HTTPStatus.OK, self.priced(Order(session.user_id, dict(session.cart)))
+
+    def add_to_cart(self, session, body, query):
+        cart = dict(session.cart)
+        for item_id, quantity in self.quantities(body).items():
+            if not Item.check_stock(item_id, cart.get(item_id, 0) + quantity):
+                raise InsufficientStockException
+            cart[item_id] = cart.get(item_id, 0) + quantity
+        session.cart = cart
+        return self.cart(session, body, query)
+
+    def clear_cart(self, session, body, query):
+        session.cart = {}
+        return HTTPStatus.OK, {}
+
+    def orders(self, session, body, query):
+        return HTTPStatus.OK, {"orders": [order._asdict() for order in Order.records(user=session.user_id)]}
+
+    def place_order(self, session, body, query):
+        items = self.quantities(body) if "items" in body else dict(session.cart)
+        order_id = place_order(session.user_id, items, self.text(body, "coupon", None))
+        if "items" not in body:
+            session.cart = {}
+        return HTTPStatus.CREATED, {"id": str(order_id), **Order.read(Order.filename)[str(order_id)]}
+
+    def cancel_order(self, session, body, query, order_id):
+        cancel_order(session.user_id, order_id)
+        return HTTPStatus.OK, {}
+
+    def pay_order(self, session, body, query, order_id):
+        pay_order(session.user_id, order_id)
+        return HTTPStatus.OK, {"id": order_id, **Order.read(Order.filename)[order_id]}
+
+    def reports(self, session, body, query):
+        from reports import OrderReports  # pandas is loaded only for reports
+        from sharded_reports import order_totals  # process pool is loaded only for reports
+        try:
+            count = int(query.get("count", 3))
+            days = int(query["days"]) if query.get("days") else None
+        except ValueError as exc:
+            raise OrderAPPException("Count and days must be integers.") from exc
+        reports = OrderReports.load()
+        totals = order_totals()
+        products = Item.read(Item.filename)
+        return HTTPStatus.OK, {
+            "orders": totals.orders,
+            "brutto": totals.brutto,
+            "paid": totals.paid,
+            "popular": [{"id": item_id, "name": products.get(item_id, {}).get("name"), "sold": quantity}
+                        for item_id, quantity in Sales.top_items(count, days)],
+            "revenue_by_day": {str(day): round(total, 2) for day, total in reports.revenue_by_day().items()},
+        }
+
+
+class OrderServer:
+    """Asyncio HTTP/1.1 server, with keep-alive connections and json bodies."""
+
+    def __init__(self, api: OrderAPI = None, workers: int = API_WORKERS):
+        self.api = api or OrderAPI()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="order-api")
+        self.locks = None
+
+    async def call(self, reads, writes, function, *args):
+        """
+        Run blocking function in the thread pool while holding the files it uses.
+        Param reads: names of files the function only reads.
+        Param writes: names of files the function changes.
+        Return: result of the function.
+        """
+        loop = asyncio.get_running_loop()
+        async with self.locks.hold(reads, writes):
+            return await loop.run_in_executor(self.executor, function, *args)
+
+    async def dispatch(self, method: str, target: str, headers: dict, body: bytes) -> tuple:
+        """
+        Run the handler of one request.
+        Return: tuple with HTTP status and payload.
+        """
+        url = urlsplit(target)
+        try:
+            route, groups = self.api.route(method, url.path.rstrip("/") or "/")
+        except LookupError as exc:
+            return exc.args[0], {"error": exc.args[0].phrase}
+        try:
+            # Checking the session reads users file, so it runs in the thread pool like handlers do.
+            session = await self.call((USERS,), (), self.api.session, headers) if route.login else None
+            if route.login and session is None:
+                return HTTPStatus.UNAUTHORIZED, {"error": "Log in to use this option."}
+            if route.admin and not session.admin:
+                return HTTPStatus.FORBIDDEN, {"error": AdminStatusException().__str__()}
+            try:
+                data = json.loads(body) if body else {}
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                return HTTPStatus.BAD_REQUEST, {"error": "Body must be a json object."}
+            return await self.call(
+                route.reads, route.writes, route.handler, session, data, dict(parse_qsl(url.query)), *groups
+            )
+        except OrderAPPException as e:
+            status = next((status for error, status in ERROR_STATUS if isinstance(e, error)), HTTPStatus.BAD_REQUEST)
+            return status, {"error": e.__str__()}
+        except Exception:
+            # Answer anyway, so one failing request does not drop the connection.
+            traceback.print_exc()
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": HTTPStatus.INTERNAL_SERVER_ERROR.phrase}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve requests of one connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    await self.respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Bad request."}, False)
+                    break
+                if length > MAX_BODY:
+                    await self.respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Body too large."}, False)
+                    break
+                body = await reader.readexactly(length)
+                keep_alive = headers.get("connection", "").lower() != "close" and version != "HTTP/1.0"
+                status, payload = await self.dispatch(method.upper(), target, headers, body)
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def respond(writer: asyncio.StreamWriter, status: HTTPStatus, payload: dict, keep_alive: bool) -> None:
+        data = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+
+    async def start(self, host: str = API_HOST, port: int = API_PORT) -> asyncio.AbstractServer:
+        """
+        Start serving in the running event loop.
+        Return: asyncio server.
+        """
+        self.locks = FileLocks()
+        return await asyncio.start_server(self.handle, host, port, backlog=1024)
+
+    async def serve(self, host: str = API_HOST, port: int = API_PORT) -> None:
+        server = await self.start(host, port)
+        print(f"Serving Order APP on http://{host}:{server.sockets[0].getsockname()[1]} ♫")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=True)
+            Item.save_stock()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve Order APP as HTTP/JSON service.")
+    parser.add_argument("--host", default=API_HOST, help="address to listen on")
+    parser.add_argument("--port", type=int, default=API_PORT, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="threads for model calls")
+    args = parser.parse_args()
+    try:
+        asyncio.run(OrderServer(workers=args.workers).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Order placement without terminal input, for batch ingestion and other programmatic callers.
+Batch command: python -m services.orders FILE [--batch-size N]
+FILE is JSONL with one order per line ({"user_id": "3", "items": {"1": 2}, "coupon": null}), or csv with
+'order', 'user_id', 'item_id', 'quantity' and 'coupon' columns, where consecutive rows with the same 'order' value
+are lines of one order.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from itertools import groupby, islice
+
+from models.coupons import Coupon
+from models.items import Item
+from models.orders import Order
+from models.sales import Sales
+from models.sessions import sessions
+from models.users import User
+from app_exceptions.exceptions import *
+
+BATCH_SIZE = 500
+
+
+def place_order(user_id: str, items: dict, coupon: str = None) -> int:
+    """
+    Place one order: reserve items on stock, apply coupon or wholesale discount and save the order to user.
+    Param user_id: ID of user, str.
+    Param items: dict, item ID -> quantity.
+    Param coupon: user's unused coupon, or None for no coupon discount.
+    Return: ID of saved order, int.
+    """
+    order_id, error = place_orders([(user_id, items, coupon)])[0]
+    if error:
+        raise error
+    return order_id
+
+
+def place_orders(requests: list) -> list:
+    """
+    Place several orders with one write of users, orders, items, coupons and sales file.
+    Files are locked for the whole batch, so every order sees stock and coupons left by previous ones.
+    Order that cannot be placed changes nothing and does not stop other orders.
+    Param requests: list of (user_id, {item_id: quantity}, coupon or None) tuples.
+    Return: list of (order ID, None) or (None, OrderAPPException) tuples, in order of requests.
+    """
+    results = []
+    placed = []
+    with User.transaction(User.filename) as users, Order.transaction(Order.filename) as orders, \
+            Item.transaction(Item.filename) as items, Coupon.transaction(Coupon.filename) as coupons:
+        for user_id, quantities, coupon in requests:
+            try:
+                order = _prepare_order(users, items, coupons, user_id, quantities, coupon)
+            except OrderAPPException as e:
+                results.append((None, e))
+                continue
+            placed.append((len(results), order))
+            results.append(None)
+        if placed:
+            sold = {}
+            for order_id, (position, order) in zip(Order.reserve_ids(len(placed)), placed):
+                record = order.to_record()
+                orders[str(order_id)] = record
+                users[order.user_id]["orders"].append(order_id)
+                day_sold = sold.setdefault(record["date"][:10], {})
+                for item_id, quantity in record["items"].items():
+                    day_sold[item_id] = day_sold.get(item_id, 0) + quantity
+                results[position] = (order_id, None)
+                sessions.invalidate(order.user_id)
+            Sales.add(sold)
+    return results
+
+
+def cancel_order(user_id: str, order_id: str) -> None:
+    """
+    Cancel user's unpaid order: return its items to stock, refund the coupon and remove order from user.
+    Param user_id: ID of user, str.
+    Param order_id: ID of order, str.
+    Return: None.
+    """
+    user_id, order_id = str(user_id), str(order_id)
+    with User.transaction(User.filename) as users, Order.transaction(Order.filename) as orders:
+        order = orders.get(order_id)
+        if order is None or str(order["user"]) != user_id:
+            raise NonExistingOrderException
+        if order["status"] == "paid":
+            raise OrderAPPException("Paid order cannot be canceled.")
+        Order.remove(order_id)
+        if order.get("coupon_used"):
+            Coupon.refund_coupon(users[user_id]["coupon"])
+        if int(order_id) in users[user_id]["orders"]:
+            users[user_id]["orders"].remove(int(order_id))
+    sessions.invalidate(user_id)
+
+
+def pay_order(user_id: str, order_id: str) -> None:
+    """
+    Mark user's order as paid.
+    Param user_id: ID of user, str.
+    Param order_id: ID of order, str.
+    Return: None.
+    """
+    user_id, order_id = str(user_id), str(order_id)
+    with Order.transaction(Order.filename) as orders:
+        order = orders.get(order_id)
+        if order is None or str(order["user"]) != user_id:
+            raise NonExistingOrderException
+        if order["status"] == "paid":
+            raise OrderAPPException("Order is already paid.")
+        order["status"] = "paid"
+    sessions.invalidate(user_id)
+
+
+def _prepare_order(users: dict, items: dict, coupons: dict, user_id, quantities: dict, coupon) -> Order:
+    """
+    Check order request against current records, then reserve items on stock and use the coupon.
+    Records are changed only if order can be placed.
+    Return: priced Order with 'ordered' status.
+    """
+    user_id = str(user_id)
+    if user_id not in users:
+        raise NonExistingUserException
+    if not quantities:
+        raise OrderAPPException("Order has no items.")
+    quantities = {str(item_id): quantity for item_id, quantity in quantities.items()}
+    for item_id, quantity in quantities.items():
+        if item_id not in items:
+            raise NonExistingItemException
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+            raise InvalidStockNumberException
+    if coupon:
+        if coupon != users[user_id]["coupon"] or coupon not in coupons:
+            raise InvalidCouponNumberException
+        if coupons[coupon].get("used", False):
+            raise OrderAPPException("Coupon is already used.")
+    order = Order(user_id, quantities, status="ordered", coupon_used=bool(coupon))
+    order.price_summary()
+    shortfalls = Item.reserve_stock(quantities)
+    if shortfalls:
+        raise InsufficientStockException(
+            f"Not enough products on stock for items: {', '.join(map(str, shortfalls))}."
+        )
+    if coupon:
+        coupons[coupon]["used"] = True
+    return order
+
+
+def read_requests(filename: str):
+    """
+    Read order requests from JSONL or csv file (by extension), one order at a time.
+    Param filename: Name of the file, str.
+    Return: generator of (line number, request) tuples. Request is (user_id, items, coupon) tuple,
+    or OrderAPPException if the line cannot be read. Raises OrderAPPException if csv file has no 'order' column.
+    """
+    with open(filename, newline="") as reader:
+        if filename.endswith(".csv"):
+            rows = csv.DictReader(reader)
+            if "order" not in (rows.fieldnames or []):
+                raise OrderAPPException(f"{filename} has no 'order' column.")
+            # Rows without order value are not grouped with anything, each is rejected on its own.
+            for _, lines in groupby(enumerate(rows, 2), key=lambda row: (row[1]["order"] or "").strip() or row[0]):
+                lines = list(lines)
+                number, first = lines[0]
+                if not (first["order"] or "").strip():
+                    yield number, OrderAPPException("Row must have order value.")
+                    continue
+                try:
+                    items = {}
+                    for _, row in lines:
+                        items[row["item_id"]] = items.get(row["item_id"], 0) + int(row["quantity"])
+                except (KeyError, TypeError, ValueError):
+                    yield number, OrderAPPException("Row must have item_id and integer quantity.")
+                    continue
+                yield number, (first.get("user_id"), items, first.get("coupon") or None)
+        else:
+            for number, line in enumerate(reader, 1):
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    yield number, (request["user_id"], dict(request["items"]), request.get("coupon"))
+                except (KeyError, TypeError, ValueError):
+                    yield number, OrderAPPException("Line must be a json object with user_id and items.")
+
+
+def ingest(filename: str, batch_size: int = BATCH_SIZE) -> tuple:
+    """
+    Place all orders from a file, saving them in batches of batch_size orders. Rejected orders are printed.
+    Param filename: Name of the file, str.
+    Param batch_size: number of orders saved together, int.
+    Return: tuple with number of placed and rejected orders.
+    """
+    placed = rejected = 0
+    requests = read_requests(filename)
+    while batch := list(islice(requests, batch_size)):
+        valid = [(number, request) for number, request in batch if not isinstance(request, OrderAPPException)]
+        errors = [(number, request) for number, request in batch if isinstance(request, OrderAPPException)]
+        results = place_orders([request for _, request in valid]) if valid else []
+        errors.extend((number, error) for (number, _), (_, error) in zip(valid, results) if error)
+        for number, error in sorted(errors, key=lambda error: error[0]):
+            print(f"Line {number}: {error}")
+        rejected += len(errors)
+        placed += len(batch) - len(errors)
+    return placed, rejected
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Place orders from JSONL or csv file.")
+    parser.add_argument("filename", help="JSONL or csv file with orders")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="orders saved together")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    try:
+        placed, rejected = ingest(args.filename, args.batch_size)
+    except OrderAPPException as e:
+        sys.exit(e.__str__())
+    finally:
+        Item.save_stock()
+    seconds = time.perf_counter() - start
+    print(f"Placed {placed} orders, rejected {rejected}, in {seconds:.2f} s "
+          f"({placed / seconds if seconds else 0:.0f} orders/sec).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Order totals computed by map/reduce over shards of orders (ranges of order IDs).
+With storage that can read a range of records (sqlite), shards are read and summed in REPORT_WORKERS processes,
+once there are at least PARALLEL_REPORTS_MIN orders. Otherwise all orders are summed in this process.
+Amounts are summed in whole cents, so totals do not depend on how orders are split into shards.
+Sold pieces per item feed the sales counters (models.sales) and amounts per user feed the revenue by user report.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from multiprocessing import get_context
+
+from dotenv import load_dotenv
+
+from models.orders import Order
+from storage.locks import file_lock, holds_exclusive
+
+load_dotenv()
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", os.cpu_count() or 1))
+PARALLEL_REPORTS_MIN = int(os.getenv("PARALLEL_REPORTS_MIN", 200000))
+# Shards per worker, so workers that finish early take over the rest.
+SHARDS_PER_WORKER = 4
+
+
+class OrderTotals:
+    """Number of orders, brutto and paid amount, sold pieces per day and item and orders and amount per user."""
+    __slots__ = ("orders", "brutto_cents", "paid_cents", "sold", "users")
+
+    def __init__(self):
+        self.orders = 0
+        self.brutto_cents = 0
+        self.paid_cents = 0
+        self.sold = {}  # day ('YYYY-MM-DD', or None if not known) -> {item ID: pieces}
+        self.users = {}  # user ID -> [orders, amount in cents]
+
+    def add(self, order: dict) -> None:
+        """
+        Add one order record.
+        Param order: order record, dict.
+        Return: None.
+        """
+        cents = round((order.get("total") or 0) * 100)
+        self.orders += 1
+        self.brutto_cents += cents
+        if order["status"] == "paid":
+            self.paid_cents += cents
+        sold = self.sold.setdefault((order.get("date") or "")[:10] or None, {})
+        for item_id, quantity in order["items"].items():
+            sold[item_id] = sold.get(item_id, 0) + quantity
+        user = self.users.setdefault(str(order["user"]), [0, 0])
+        user[0] += 1
+        user[1] += cents
+
+    def merge(self, other: "OrderTotals") -> "OrderTotals":
+        """
+        Add totals of the next shard.
+        Param other: OrderTotals of another shard.
+        Return: self.
+        """
+        self.orders += other.orders
+        self.brutto_cents += other.brutto_cents
+        self.paid_cents += other.paid_cents
+        for day, items in other.sold.items():
+            sold = self.sold.setdefault(day, {})
+            for item_id, quantity in items.items():
+                sold[item_id] = sold.get(item_id, 0) + quantity
+        for user_id, (orders, cents) in other.users.items():
+            user = self.users.setdefault(user_id, [0, 0])
+            user[0] += orders
+            user[1] += cents
+        return self
+
+    @property
+    def brutto(self) -> float:
+        return self.brutto_cents / 100
+
+    @property
+    def paid(self) -> float:
+        return self.paid_cents / 100
+
+    def revenue_by_user(self) -> list:
+        """
+        Number of orders and amount per user, largest amount first.
+        Return: list of (user ID, orders, amount) tuples.
+        """
+        per_user = sorted(self.users.items(), key=lambda user: user[1][1], reverse=True)
+        return [(user_id, orders, cents / 100) for user_id, (orders, cents) in per_user]
+
+
+def sum_orders(orders) -> OrderTotals:
+    """
+    Map step: sum order records.
+    Param orders: iterable of order records.
+    Return: OrderTotals.
+    """
+    totals = OrderTotals()
+    for order in orders:
+        totals.add(order)
+    return totals
+
+
+def sum_shard(bounds: tuple) -> OrderTotals:
+    """
+    Map step run by worker processes: read orders with IDs in bounds and sum them.
+    Param bounds: (low, high) order IDs, both included.
+    Return: OrderTotals.
+    """
+    return sum_orders(Order.read_range(Order.filename, *bounds).values())
+
+
+def order_totals(workers: int = REPORT_WORKERS) -> OrderTotals:
+    """
+    Sum all orders, in parallel shards when storage can read them separately and there are enough orders.
+    Orders file is locked for reading meanwhile, so all shards see the same orders. If this thread already holds
+    exclusive lock on it, worker processes could not read it, so orders are summed in this process.
+    Param workers: number of processes, int.
+    Return: OrderTotals.
+    """
+    with file_lock(Order.filename, shared=True):
+        if workers > 1 and hasattr(Order.storage, "load_range") and not holds_exclusive(Order.filename):
+            shards = Order.id_ranges(Order.filename, workers * SHARDS_PER_WORKER)
+            if shards and shards[-1][1] - shards[0][0] + 1 >= PARALLEL_REPORTS_MIN:
+                # spawned workers do not inherit threads and open database connections of this process
+                with ProcessPoolExecutor(workers, mp_context=get_context("spawn")) as pool:
+                    return reduce(OrderTotals.merge, pool.map(sum_shard, shards), OrderTotals())
+        return sum_orders(Order.read(Order.filename).values())
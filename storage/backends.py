@@ -0,0 +1,246 @@
+"""Storage backends used by BaseClass for reading and writing records."""
+import json
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from storage.codecs import get_codec, decode
+
+load_dotenv()
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+JOURNAL_COMPACT_AFTER = int(os.getenv("JOURNAL_COMPACT_AFTER", 1000))
+# Files changed within this time (ns) are not trusted to have a different mtime after another change.
+RECENT_CHANGE_NS = 50_000_000
+
+
+def replace_file(filename: str, data: bytes) -> None:
+    """
+    Write data to a temporary file and move it over filename, so readers never see a partly written file.
+    Param filename: Name of the file, str.
+    Param data: new content of the file, bytes.
+    Return: None.
+    """
+    temp_name = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_name, "wb") as writer:
+            writer.write(data)
+        os.replace(temp_name, filename)
+    finally:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+
+
+class JsonStorage:
+    """
+    Keeps all records of one file in a single document, rewritten on every save.
+    Documents are written with the codec from STORAGE_CODEC and read in whatever format they were written.
+    """
+
+    def __init__(self, codec=None):
+        self.codec = codec or get_codec()
+
+    def signature(self, filename: str) -> tuple:
+        """
+        Get modification time, size and inode of the file, used for cache invalidation.
+        Files are rewritten by replacing them (replace_file), so every rewrite gets a new inode, even when time
+        and size stay the same.
+        Param filename: Name of the file, str.
+        Return: tuple.
+        """
+        stat = os.stat(filename)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def changed_recently(self, filename: str) -> bool:
+        """
+        Check if the file was changed so recently that its signature might not change after next change.
+        Param filename: Name of the file, str.
+        Return: bool.
+        """
+        return time.time_ns() - os.stat(filename).st_mtime_ns < RECENT_CHANGE_NS
+
+    def size(self, filename: str) -> int:
+        """
+        Get size of stored records in bytes.
+        Param filename: Name of the file, str.
+        Return: int.
+        """
+        return os.path.getsize(filename)
+
+    def load(self, filename: str) -> dict:
+        """
+        Load all records from the file.
+        Param filename: Name of the file, str.
+        Return: dict.
+        """
+        with open(filename, "rb") as reader:
+            return decode(reader.read())
+
+    def save(self, filename: str, records: dict, keys: list = None) -> None:
+        """
+        Save all records to the file, replacing it atomically.
+        Param filename: Name of the file, str.
+        Param records: dict object, representing data from the file.
+        Param keys: keys of changed and deleted records, not needed when the whole file is written.
+        Return: None.
+        """
+        replace_file(filename, self.codec.encode(records))
+
+    def init(self, filename: str) -> None:
+        """
+        Create empty file for storing records, dropping existing ones.
+        Param filename: Name of the file, str.
+        Return: None.
+        """
+        replace_file(filename, self.codec.encode({}))
+
+
+class JournalStorage(JsonStorage):
+    """
+    Keeps a snapshot of the records, written with the storage codec, plus an append-only json log of changed
+    records next to it.
+    Saving appends only the records with given keys, and the log is compacted into the snapshot after
+    JOURNAL_COMPACT_AFTER entries or when all records are saved.
+    Only the snapshot is checked by changed_recently, log is only appended, so its size changes on every save.
+    """
+
+    def __init__(self, compact_after: int = JOURNAL_COMPACT_AFTER, codec=None):
+        super().__init__(codec)
+        self.compact_after = compact_after
+        self._saved = {}
+
+    @staticmethod
+    def log_name(filename: str) -> str:
+        return f"{filename}.log"
+
+    def signature(self, filename: str) -> tuple:
+        """
+        Get signature of both snapshot and log file.
+        Param filename: Name of the file, str.
+        Return: tuple.
+        """
+        try:
+            log_signature = super().signature(self.log_name(filename))
+        except FileNotFoundError:
+            log_signature = None
+        return super().signature(filename), log_signature
+
+    def size(self, filename: str) -> int:
+        """
+        Get size of snapshot and log together.
+        Param filename: Name of the file, str.
+        Return: int.
+        """
+        log_name = self.log_name(filename)
+        return super().size(filename) + (super().size(log_name) if os.path.exists(log_name) else 0)
+
+    def load(self, filename: str) -> dict:
+        """
+        Rebuild records from the snapshot and the log entries written after it.
+        Param filename: Name of the file, str.
+        Return: dict.
+        """
+        signature = self.signature(filename)
+        records = super().load(filename)
+        entries = 0
+        log_size = 0
+        for line, entry in self.log_entries(filename):
+            if "value" in entry:
+                records[entry["key"]] = entry["value"]
+            else:
+                records.pop(entry["key"], None)
+            entries += 1
+            log_size += len(line)
+        self._saved[filename] = (signature, entries, log_size)
+        return records
+
+    def log_entries(self, filename: str):
+        """
+        Read complete entries of the log.
+        Param filename: Name of the file, str.
+        Return: generator of (line, entry) tuples.
+        """
+        try:
+            with open(self.log_name(filename), "rb") as reader:
+                for line in reader:
+                    try:
+                        yield line, json.loads(line)
+                    except ValueError:
+                        return  # last entry was not written completely
+        except FileNotFoundError:
+            return
+
+    def save(self, filename: str, records: dict, keys: list = None) -> None:
+        """
+        Append records with given keys to the log, or remove them from records if they are not there any more.
+        The log is compacted when it grows too long.
+        Param filename: Name of the file, str.
+        Param records: dict object, representing data from the file.
+        Param keys: keys of changed and deleted records, or None to compact all records into the snapshot.
+        Return: None.
+        """
+        saved = self._saved.get(filename)
+        if not saved or saved[0] != self.signature(filename):
+            lines = [line for line, _ in self.log_entries(filename)]
+            saved = (None, len(lines), sum(map(len, lines)))
+        _, entries, log_size = saved
+        if keys is None:
+            entries = self.compact_after + 1
+        else:
+            lines = [json.dumps({"key": str(key), "value": records[key]}) + "\n" if key in records
+                     else json.dumps({"key": str(key)}) + "\n" for key in keys]
+            entries += len(lines)
+        if entries > self.compact_after:
+            self.compact(filename, records)
+            entries = log_size = 0
+        elif lines:
+            text = "".join(lines).encode()
+            with open(self.log_name(filename), "ab") as writer:
+                writer.truncate(log_size)  # drop incomplete entry left by a crash
+                writer.write(text)
+            log_size += len(text)
+        self._saved[filename] = (self.signature(filename), entries, log_size)
+
+    def compact(self, filename: str, records: dict) -> None:
+        """
+        Write records as a new snapshot and empty the log.
+        Param filename: Name of the file, str.
+        Param records: dict object, representing data from the file.
+        Return: None.
+        """
+        replace_file(filename, self.codec.encode(records))
+        open(self.log_name(filename), "w").close()
+
+    def init(self, filename: str) -> None:
+        """
+        Create empty snapshot and empty the log.
+        Param filename: Name of the file, str.
+        Return: None.
+        """
+        super().init(filename)
+        open(self.log_name(filename), "w").close()
+        self._saved.pop(filename, None)
+
+
+_storages = {}
+
+
+def get_storage(name: str = STORAGE_BACKEND) -> JsonStorage:
+    """
+    Get shared storage backend by its name.
+    Param name: 'json', 'journal' or 'sqlite'.
+    Return: storage backend.
+    """
+    if name not in _storages:
+        if name == "json":
+            _storages[name] = JsonStorage()
+        elif name == "journal":
+            _storages[name] = JournalStorage()
+        elif name == "sqlite":
+            from storage.sqlite_storage import SqliteStorage
+            _storages[name] = SqliteStorage()
+        else:
+            raise ValueError(f"Unknown storage backend: {name}")
+    return _storages[name]
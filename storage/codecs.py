@@ -0,0 +1,80 @@
+"""
+Codecs for storing records of a file as bytes. Codec used for writing is chosen by STORAGE_CODEC:
+'json' - compact json, written with orjson when it is installed,
+'json-indent' - json indented by 4 spaces, the original format of the files,
+'marshal' - binary format of python's marshal module, fastest to read and write.
+Files are read by their content, so files written with any codec (or by older versions) are always readable.
+"""
+import json
+import marshal
+import os
+
+from dotenv import load_dotenv
+
+try:
+    import orjson
+except ImportError:  # optional, stdlib json is used instead
+    orjson = None
+
+load_dotenv()
+
+STORAGE_CODEC = os.getenv("STORAGE_CODEC", "json")
+# Binary files start with this header, json documents never start with a zero byte.
+MARSHAL_HEADER = b"\x00orderapp-marshal-1\n"
+
+
+class JsonCodec:
+    """Compact json, without whitespace."""
+    name = "json"
+
+    def encode(self, records: dict) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(records, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(records, separators=(",", ":")).encode()
+
+
+class IndentedJsonCodec:
+    """Json indented by 4 spaces."""
+    name = "json-indent"
+
+    def encode(self, records: dict) -> bytes:
+        return json.dumps(records, indent=4).encode()
+
+
+class MarshalCodec:
+    """
+    Binary records written with marshal, behind MARSHAL_HEADER. Records must be json compatible, and keys
+    are converted to str like json does, so records read back are the same with every codec.
+    """
+    name = "marshal"
+
+    def encode(self, records: dict) -> bytes:
+        return MARSHAL_HEADER + marshal.dumps({str(key): value for key, value in records.items()})
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), IndentedJsonCodec(), MarshalCodec())}
+
+
+def get_codec(name: str = STORAGE_CODEC):
+    """
+    Get codec used for writing files by its name.
+    Param name: 'json', 'json-indent' or 'marshal'.
+    Return: codec.
+    """
+    try:
+        return CODECS[name]
+    except KeyError as exc:
+        raise ValueError(f"Unknown storage codec: {name}") from exc
+
+
+def decode(data: bytes) -> dict:
+    """
+    Decode records written by any codec, detecting the format from the content.
+    Param data: content of the file, bytes.
+    Return: dict.
+    """
+    if data.startswith(MARSHAL_HEADER):
+        return marshal.loads(data[len(MARSHAL_HEADER):])
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
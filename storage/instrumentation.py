@@ -0,0 +1,126 @@
+"""
+Opt-in counters of BaseClass reads and writes, summed per action of the app (menu option).
+IO_STATS=1 prints after every action how many reads (and parses of changed files) and writes it made,
+with bytes and time per file and per calling model method.
+PROFILE_DIR=<directory> saves cProfile stats of every action to '<directory>/<action>_<time>.prof'.
+"""
+import cProfile
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+IO_STATS = os.getenv("IO_STATS", "").lower() not in ("", "0", "false", "no")
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+# Frames in these files are skipped when looking for the model method that made the call.
+_INTERNAL_FILES = ("base_class.py", "contextlib.py", os.path.basename(__file__))
+
+
+def caller_name() -> str:
+    """
+    Qualified name of the first function on the stack outside BaseClass and this module, like 'Item.show_products'.
+    Return: str.
+    """
+    frame = sys._getframe(1)
+    while frame and os.path.basename(frame.f_code.co_filename) in _INTERNAL_FILES:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    code = frame.f_code
+    return getattr(code, "co_qualname", code.co_name)  # co_qualname is new in Python 3.11
+
+
+class IOStats:
+    """Counts of reads and writes of one action, per (operation, filename, caller)."""
+
+    def __init__(self, enabled: bool = IO_STATS, profile_dir: str = PROFILE_DIR):
+        self.enabled = enabled
+        self.profile_dir = profile_dir
+        self.action = None
+        self.started = None
+        self.profiler = None
+        self.counts = defaultdict(lambda: [0, 0, 0, 0.0])  # calls, parsed, bytes, seconds
+
+    def record(self, operation: str, filename: str, seconds: float, size: int = 0, parsed: bool = False) -> None:
+        """
+        Count one read or write.
+        Param operation: 'read' or 'write'.
+        Param filename: Name of the file, str.
+        Param seconds: time spent, float.
+        Param size: size of stored records in bytes, int.
+        Param parsed: bool, True if read loaded the file instead of returning cached records.
+        Return: None.
+        """
+        count = self.counts[operation, filename, caller_name()]
+        count[0] += 1
+        count[1] += parsed
+        count[2] += size
+        count[3] += seconds
+
+    def start(self, action: str) -> None:
+        """
+        Start counting (and profiling) an action, finishing the previous one if it was not finished.
+        Param action: name of the action, str.
+        Return: None.
+        """
+        if self.action:
+            self.finish()
+        if not self.enabled and not self.profile_dir:
+            return
+        self.action = action
+        self.counts.clear()
+        self.started = time.perf_counter()
+        if self.profile_dir:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def finish(self) -> None:
+        """
+        Stop counting the action, print its summary and save its profile.
+        Return: None.
+        """
+        if not self.action:
+            return
+        elapsed = time.perf_counter() - self.started
+        if self.profiler:
+            self.profiler.disable()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            name = "".join(char if char.isalnum() else "_" for char in self.action)
+            self.profiler.dump_stats(
+                os.path.join(self.profile_dir, f"{name}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}.prof")
+            )
+            self.profiler = None
+        if self.enabled:
+            print(self.summary(elapsed), file=sys.stderr)
+        self.action = None
+
+    def summary(self, elapsed: float) -> str:
+        """
+        Summary of the action, with one line per file and caller, slowest first.
+        Param elapsed: wall time of the whole action in seconds, float.
+        Return: str.
+        """
+        totals = defaultdict(lambda: [0, 0, 0, 0.0])
+        for (operation, _, _), count in self.counts.items():
+            for index, value in enumerate(count):
+                totals[operation][index] += value
+        reads, writes = totals["read"], totals["write"]
+        lines = [
+            f"{self.action}: {reads[0]} reads ({reads[1]} parsed, {reads[2] / 1024:.1f} KB), "
+            f"{writes[0]} writes ({writes[2] / 1024:.1f} KB), {(reads[3] + writes[3]) * 1000:.0f} ms in storage, "
+            f"{elapsed * 1000:.0f} ms total"
+        ]
+        for (operation, filename, caller), (calls, parsed, size, seconds) in sorted(
+                self.counts.items(), key=lambda item: item[1][3], reverse=True):
+            parsed = f", {parsed} parsed" if operation == "read" else ""
+            lines.append(f"    {operation:<5} {filename:<24} {caller:<36} {calls:>5} calls{parsed}, "
+                         f"{size / 1024:.1f} KB, {seconds * 1000:.1f} ms")
+        return "\n".join(lines)
+
+
+io_stats = IOStats()
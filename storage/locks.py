@@ -0,0 +1,49 @@
+"""Advisory file locks shared between processes using the same files."""
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows, locking is not available
+    fcntl = None
+
+_held = threading.local()
+
+
+@contextmanager
+def file_lock(filename: str, shared=False):
+    """
+    Hold advisory lock on '<filename>.lock' while the block runs. Lock is re-entrant within a thread,
+    nested blocks on a file that is already locked by the same thread do not lock it again.
+    Param filename: Name of the locked file, str.
+    Param shared: bool, True for shared (read) lock, otherwise exclusive lock.
+    Yield: bool, True if this block acquired the lock (outermost block).
+    """
+    held = _held.__dict__.setdefault("files", {})  # filename -> True if the lock is shared
+    if filename in held:
+        yield False
+        return
+    if fcntl is None:
+        held[filename] = shared
+        try:
+            yield True
+        finally:
+            del held[filename]
+        return
+    with open(f"{filename}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        held[filename] = shared
+        try:
+            yield True
+        finally:
+            del held[filename]
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def holds_exclusive(filename: str) -> bool:
+    """
+    Check if this thread holds exclusive lock on the file, which blocks shared locks of other processes too.
+    Param filename: Name of the locked file, str.
+    Return: bool.
+    """
+    return _held.__dict__.get("files", {}).get(filename) is False
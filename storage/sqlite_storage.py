@@ -0,0 +1,187 @@
+"""SQLite storage backend with indexed tables for users, items, orders and coupons."""
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SQLITE_DATABASE = os.getenv("SQLITE_DATABASE", "files/order_app.db")
+
+# Table name -> indexed columns, as column name -> record field it is copied from.
+COLUMNS = {
+    "users": {"email": "email"},
+    "orders": {"user_id": "user", "status": "status"},
+    "coupons": {"used": "used"},
+    "items": {},
+}
+INDEXES = {
+    "users": ["CREATE UNIQUE INDEX IF NOT EXISTS users_email ON users (email)"],
+    "orders": ["CREATE INDEX IF NOT EXISTS orders_user_status ON orders (user_id, status)"],
+    "coupons": ["CREATE INDEX IF NOT EXISTS coupons_used ON coupons (used)"],
+}
+
+
+class SqliteStorage:
+    """
+    Keeps records of every file in its own SQLite table, named by the file ('files/users.txt' -> users).
+    Each row holds record key, record as json and indexed columns copied from the record.
+    Saving writes only records with given keys, changed or deleted ones, in one transaction.
+    """
+
+    def __init__(self, database: str = SQLITE_DATABASE):
+        self.database = database
+        self._local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.database)
+            connection.execute("CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER)")
+            connection.commit()
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def table_name(filename: str) -> str:
+        name = os.path.splitext(os.path.basename(filename))[0]
+        return re.sub(r"\W", "_", name)
+
+    def signature(self, filename: str) -> tuple:
+        """
+        Get version of the table, increased on every save.
+        Param filename: Name of the file, str.
+        Return: tuple.
+        """
+        row = self.connection.execute(
+            "SELECT version FROM versions WHERE name = ?", (self.table_name(filename),)
+        ).fetchone()
+        if row is None:
+            raise FileNotFoundError(filename)
+        return self.database, row[0]
+
+    def changed_recently(self, filename: str) -> bool:
+        """
+        Table versions always change on save, so cached records never need extra check.
+        Param filename: Name of the file, str.
+        Return: bool.
+        """
+        self.signature(filename)  # raises FileNotFoundError for tables that are not initialized
+        return False
+
+    def size(self, filename: str) -> int:
+        """
+        Get size of records stored as json in the table.
+        Param filename: Name of the file, str.
+        Return: int.
+        """
+        row = self.connection.execute(f"SELECT SUM(LENGTH(data)) FROM {self.table_name(filename)}").fetchone()
+        return row[0] or 0
+
+    def load(self, filename: str) -> dict:
+        """
+        Load all records from the table.
+        Param filename: Name of the file, str.
+        Return: dict.
+        """
+        table = self.table_name(filename)
+        self.signature(filename)  # raises FileNotFoundError for tables that are not initialized
+        return {key: json.loads(data) for key, data in self.connection.execute(f"SELECT key, data FROM {table}")}
+
+    def save(self, filename: str, records: dict, keys: list = None) -> None:
+        """
+        Insert or update records with given keys and delete those that are not in records any more.
+        Raises sqlite3.IntegrityError if a record conflicts with another one on a unique column, like users email.
+        Param filename: Name of the file, str.
+        Param records: dict object, representing data from the file.
+        Param keys: keys of changed and deleted records, or None to replace all rows.
+        Return: None.
+        """
+        table = self.table_name(filename)
+        self.signature(filename)  # raises FileNotFoundError for tables that are not initialized
+        columns = COLUMNS.get(table, {})
+        names = ", ".join(["key", "data", *columns])
+        marks = ", ".join("?" * (len(columns) + 2))
+        updates = ", ".join(f"{name} = excluded.{name}" for name in ["data", *columns])
+        replace_all = keys is None
+        if replace_all:
+            keys = list(records)
+        rows = [
+            (str(key), json.dumps(records[key]), *(records[key].get(field) for field in columns.values()))
+            for key in keys if key in records
+        ]
+        with self.connection as connection:
+            if replace_all:
+                connection.execute(f"DELETE FROM {table}")
+            else:
+                connection.executemany(f"DELETE FROM {table} WHERE key = ?",
+                                       [(str(key),) for key in keys if key not in records])
+            # Upsert by key only, so a row conflicting on a unique column (users email) raises IntegrityError
+            # instead of being silently replaced.
+            connection.executemany(
+                f"INSERT INTO {table} ({names}) VALUES ({marks}) ON CONFLICT (key) DO UPDATE SET {updates}", rows
+            )
+            connection.execute("UPDATE versions SET version = version + 1 WHERE name = ?", (table,))
+
+    def find(self, filename: str, fields: dict) -> (dict, None):
+        """
+        Find records by indexed columns.
+        Param filename: Name of the file, str.
+        Param fields: dict, record field -> searched value.
+        Return: dict with matching records, or None if some field is not indexed.
+        """
+        table = self.table_name(filename)
+        columns = {field: column for column, field in COLUMNS.get(table, {}).items()}
+        if not fields or any(field not in columns for field in fields):
+            return None
+        self.signature(filename)  # raises FileNotFoundError for tables that are not initialized
+        conditions = " AND ".join(f"{columns[field]} = ?" for field in fields)
+        rows = self.connection.execute(f"SELECT key, data FROM {table} WHERE {conditions}", tuple(fields.values()))
+        return {key: json.loads(data) for key, data in rows}
+
+    def key_bounds(self, filename: str) -> tuple:
+        """
+        Get lowest and highest numeric record key.
+        Param filename: Name of the file, str.
+        Return: tuple of ints, (None, None) for empty table.
+        """
+        self.signature(filename)  # raises FileNotFoundError for tables that are not initialized
+        return self.connection.execute(
+            f"SELECT MIN(CAST(key AS INTEGER)), MAX(CAST(key AS INTEGER)) FROM {self.table_name(filename)}"
+        ).fetchone()
+
+    def load_range(self, filename: str, low: int, high: int) -> dict:
+        """
+        Load records with numeric keys from low to high (both included).
+        Param filename: Name of the file, str.
+        Param low: lowest key, int.
+        Param high: highest key, int.
+        Return: dict.
+        """
+        self.signature(filename)  # raises FileNotFoundError for tables that are not initialized
+        rows = self.connection.execute(
+            f"SELECT key, data FROM {self.table_name(filename)} WHERE CAST(key AS INTEGER) BETWEEN ? AND ?",
+            (low, high)
+        )
+        return {key: json.loads(data) for key, data in rows}
+
+    def init(self, filename: str) -> None:
+        """
+        Create empty table for storing records, dropping existing one.
+        Param filename: Name of the file, str.
+        Return: None.
+        """
+        table = self.table_name(filename)
+        columns = "".join(f", {column}" for column in COLUMNS.get(table, {}))
+        with self.connection as connection:
+            connection.execute(f"DROP TABLE IF EXISTS {table}")
+            connection.execute(f"CREATE TABLE {table} (key TEXT PRIMARY KEY, data TEXT{columns})")
+            for index in INDEXES.get(table, []):
+                connection.execute(index)
+            connection.execute(
+                "INSERT INTO versions VALUES (?, 1) ON CONFLICT (name) DO UPDATE SET version = version + 1", (table,)
+            )
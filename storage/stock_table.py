@@ -0,0 +1,200 @@
+"""
+Optional table of item prices and stocks in a fixed-width binary file, memory-mapped, enabled by STOCK_TABLE=<path>.
+Row of item n starts at HEADER.size + (n - 1) * ROW.size, so item ID is the index of its row, and stock is checked
+and changed in place, without parsing or writing the whole items file. Names stay in items file.
+Header holds generation, increased on every change, so other processes can tell that stock changed.
+Stocks are copied back to items file by Item.save_stock when the CLI, API server or batch ingestion exits.
+"""
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+from storage.locks import file_lock
+
+load_dotenv()
+
+STOCK_TABLE = os.getenv("STOCK_TABLE")
+MAGIC = b"ORDSTK01"
+HEADER = struct.Struct("<8sq")  # magic, generation
+ROW = struct.Struct("<qdq")  # item ID (0 for no item), price, stock
+GENERATION = struct.Struct("<q")
+MIN_ROWS = 1024
+
+
+def row_number(item_id):
+    """
+    Row number of the item, only for IDs written the way they are stored in items file ('1', not '01' or ' 1').
+    Param item_id: item ID, str or int.
+    Return: int, or None if item ID is not a positive integer.
+    """
+    if isinstance(item_id, str):
+        if not item_id.isdecimal() or str(int(item_id)) != item_id:
+            return None
+        item_id = int(item_id)
+    elif not isinstance(item_id, int):
+        return None
+    return item_id if item_id > 0 else None
+
+
+class StockTable:
+    """
+    Prices and stocks of items by item ID. Changes are made under lock of the file, shared between processes.
+    Table with generation 0 has never been filled.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.__file = None
+        self.__map = None
+        self.__rows = 0
+
+    def __remap(self) -> None:
+        """Map the whole file again, after it was created or grown (by any process)."""
+        if self.__file is None:
+            self.__file = os.fdopen(os.open(self.filename, os.O_RDWR | os.O_CREAT, 0o644), "r+b")
+        size = os.fstat(self.__file.fileno()).st_size
+        if size < HEADER.size:
+            with file_lock(self.filename):
+                size = os.fstat(self.__file.fileno()).st_size
+                if size < HEADER.size:
+                    self.__file.truncate(HEADER.size + MIN_ROWS * ROW.size)
+                    self.__file.seek(0)
+                    self.__file.write(HEADER.pack(MAGIC, 0))
+                    self.__file.flush()
+                    size = HEADER.size + MIN_ROWS * ROW.size
+        # Previous map is not closed, threads still reading it keep it until they are done.
+        table = mmap.mmap(self.__file.fileno(), size)
+        if table[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.filename} is not a stock table.")
+        self.__map = table
+        self.__rows = (size - HEADER.size) // ROW.size
+
+    def __offset(self, item_id, grow=False):
+        """
+        Offset of item's row.
+        Param item_id: item ID, str or int.
+        Param grow: bool, True to grow the file if the row is behind its end (only under lock).
+        Return: int, or None if item ID is not a positive integer or its row is not in the file.
+        """
+        number = row_number(item_id)
+        if number is None:
+            return None
+        if self.__map is None or number > self.__rows:
+            self.__remap()
+            if number > self.__rows:
+                if not grow:
+                    return None
+                self.__file.truncate(HEADER.size + max(number, 2 * self.__rows) * ROW.size)
+                self.__remap()
+        return HEADER.size + (number - 1) * ROW.size
+
+    @property
+    def generation(self) -> int:
+        if self.__map is None:
+            self.__remap()
+        return GENERATION.unpack_from(self.__map, len(MAGIC))[0]
+
+    def __changed(self) -> None:
+        GENERATION.pack_into(self.__map, len(MAGIC), self.generation + 1)
+
+    @contextmanager
+    def locked(self):
+        """
+        Hold lock of the table while the block changes it. Generation is increased when the block ends.
+        Yield: self.
+        """
+        with file_lock(self.filename) as outermost:
+            try:
+                yield self
+            finally:
+                if outermost:
+                    self.__changed()
+
+    def get(self, item_id):
+        """
+        Get price and stock of the item.
+        Param item_id: item ID, str or int.
+        Return: tuple with price and stock, or None if there is no such item.
+        """
+        offset = self.__offset(item_id)
+        if offset is None:
+            return None
+        row_id, price, stock = ROW.unpack_from(self.__map, offset)
+        return (price, stock) if row_id == (offset - HEADER.size) // ROW.size + 1 else None
+
+    def put(self, item_id, price: float, stock: int) -> None:
+        """
+        Set price and stock of the item, adding the item if it is not in the table. Call under locked().
+        Param item_id: item ID, str or int.
+        Return: None.
+        """
+        offset = self.__offset(item_id, grow=True)
+        if offset is None:
+            raise ValueError(f"Item ID {item_id} cannot be stored in stock table.")
+        ROW.pack_into(self.__map, offset, (offset - HEADER.size) // ROW.size + 1, price, stock)
+
+    def remove(self, item_id) -> None:
+        """
+        Remove the item from the table. Call under locked().
+        Param item_id: item ID, str or int.
+        Return: None.
+        """
+        offset = self.__offset(item_id)
+        if offset is not None:
+            ROW.pack_into(self.__map, offset, 0, 0.0, 0)
+
+    def reserve(self, quantities: dict, release=False) -> dict:
+        """
+        Take quantities of several items from stock, or none of them if any is missing. Call under locked().
+        Param quantities: dict, item ID -> quantity.
+        Param release: bool, True if quantities are returned to stock (missing items are skipped).
+        Return: dict, item ID -> missing quantity. Empty if all quantities are reserved.
+        """
+        rows = {item_id: self.get(item_id) for item_id in quantities}
+        shortfalls = {}
+        for item_id, qty in quantities.items():
+            if rows[item_id] is None:
+                shortfalls[item_id] = qty
+            elif not release and rows[item_id][1] < qty:
+                shortfalls[item_id] = qty - rows[item_id][1]
+        if shortfalls and not release:
+            return shortfalls
+        for item_id, qty in quantities.items():
+            if rows[item_id] is not None:
+                price, stock = rows[item_id]
+                self.put(item_id, price, stock + qty if release else stock - qty)
+        return shortfalls
+
+    def load(self, items: dict) -> None:
+        """
+        Replace all rows with prices and stocks of item records. Call under locked().
+        Param items: dict, item ID -> item record.
+        Return: None.
+        """
+        if self.__map is None:
+            self.__remap()
+        self.__map[HEADER.size:] = bytes(len(self.__map) - HEADER.size)
+        for item_id, item in items.items():
+            self.put(item_id, item["price"], item["stock"])
+
+    def init(self) -> None:
+        """
+        Empty the table, it is filled from items file when it is used next time.
+        Return: None.
+        """
+        with file_lock(self.filename):
+            if self.__map is None:
+                self.__remap()
+            self.__map[len(MAGIC):] = bytes(len(self.__map) - len(MAGIC))
+
+
+def get_stock_table(filename: str = STOCK_TABLE):
+    """
+    Get stock table, if it is enabled.
+    Param filename: path of the table file, str, or None when the table is not used.
+    Return: StockTable or None.
+    """
+    return StockTable(filename) if filename else None
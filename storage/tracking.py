@@ -0,0 +1,94 @@
+"""
+Records of one file as cached by BaseClass. While a transaction runs, records remember which keys were read or
+changed by the transaction's thread, with their json before the first access, so storage saves only records that
+really changed.
+"""
+import json
+import threading
+
+
+def encode(value) -> str:
+    return json.dumps(value)
+
+
+class Records(dict):
+    """Records of one file, record key (str) -> record."""
+    __slots__ = ("_before", "_owner")
+
+    def track(self) -> None:
+        """
+        Start tracking records accessed by this thread.
+        Return: None.
+        """
+        self._before = {}
+        self._owner = threading.get_ident()
+        self.__class__ = TrackedRecords
+
+    def changes(self):
+        """
+        Stop tracking and get keys of records changed, added or deleted since track().
+        Return: list of keys, or None if any record may have changed (records were accessed all at once).
+        """
+        self.__class__ = Records
+        before, self._before = self._before, None
+        if before is None:
+            return None
+        return [key for key, encoded in before.items()
+                if encoded != (encode(dict.__getitem__(self, key)) if key in self else None)]
+
+
+class TrackedRecords(Records):
+    """Records during a transaction. Keys are stored as str, like they are read back from storage."""
+    __slots__ = ()
+
+    def _touch(self, key) -> str:
+        key = str(key)
+        before = self._before
+        if before is not None and key not in before and self._owner == threading.get_ident():
+            before[key] = encode(dict.__getitem__(self, key)) if dict.__contains__(self, key) else None
+        return key
+
+    def _touch_all(self) -> None:
+        if self._owner == threading.get_ident():
+            self._before = None
+
+    def __getitem__(self, key):
+        return dict.__getitem__(self, self._touch(key))
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, self._touch(key), value)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, self._touch(key))
+
+    def __contains__(self, key):
+        return dict.__contains__(self, str(key))
+
+    def get(self, key, default=None):
+        return dict.get(self, self._touch(key), default)
+
+    def pop(self, key, *default):
+        return dict.pop(self, self._touch(key), *default)
+
+    def setdefault(self, key, default=None):
+        return dict.setdefault(self, self._touch(key), default)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def items(self):
+        self._touch_all()
+        return dict.items(self)
+
+    def values(self):
+        self._touch_all()
+        return dict.values(self)
+
+    def popitem(self):
+        self._touch_all()
+        return dict.popitem(self)
+
+    def clear(self):
+        self._touch_all()
+        dict.clear(self)
@@ -0,0 +1,30 @@
+"""Tests run in a temporary directory with empty files, run them with 'python -m pytest' from the project root."""
+import os
+
+import pytest
+
+# Settings read when models are imported, usually from .env.
+os.environ.setdefault("WHOLESALE_MINIMUM", "1000")
+os.environ.setdefault("WHOLESALE_DISCOUNT", "0.85")
+os.environ.setdefault("COUPON_DISCOUNT", "0.95")
+os.environ.setdefault("ADMIN1", "admin")
+os.environ.setdefault("PASSWORD1", "admin")
+
+from models.base_class import BaseClass  # noqa: E402
+
+FILES = ("files/users.txt", "files/items.txt", "files/orders.txt", "files/coupons.txt", "files/sales.txt",
+         "files/email_index.txt", "files/sequences.txt")
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    """Empty files in a temporary working directory."""
+    monkeypatch.chdir(tmp_path)
+    # New backend, so nothing opened in another test's directory is reused (like the sqlite connection).
+    monkeypatch.setattr(BaseClass, "storage", type(BaseClass.storage)())
+    os.makedirs("files")
+    BaseClass.clear_cache()
+    for filename in FILES:
+        BaseClass.storage.init(filename)
+    yield tmp_path
+    BaseClass.clear_cache()
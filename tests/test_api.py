@@ -0,0 +1,57 @@
+import asyncio
+import json
+import threading
+from http import HTTPStatus
+
+from models.orders import Order
+from models.sessions import sessions
+from models.users import User
+from services.api import FileLocks, OrderServer, Route
+
+
+def dispatch(server: OrderServer, method: str, target: str, body: dict, headers: dict = None) -> tuple:
+    """Run one request through the server without a connection."""
+    async def run():
+        server.locks = FileLocks()
+        return await server.dispatch(method, target, headers or {}, json.dumps(body).encode())
+    return asyncio.run(run())
+
+
+def test_wrong_field_type_is_bad_request(files):
+    server = OrderServer(workers=1)
+    status, payload = dispatch(server, "POST", "/login", {"email": 5})
+    assert status == HTTPStatus.BAD_REQUEST
+    assert payload == {"error": "Email must be a string."}
+
+
+def test_unexpected_error_is_answered(files):
+    server = OrderServer(workers=1)
+
+    def fail(session, body, query):
+        raise TypeError("boom")
+
+    server.api.routes.append(Route("GET", "/fail", fail, login=False))
+    status, payload = dispatch(server, "GET", "/fail", {})
+    assert status == HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+def test_session_is_checked_in_worker_thread(files, monkeypatch):
+    server = OrderServer(workers=1)
+    threads = []
+    monkeypatch.setattr(sessions, "get", lambda token: threads.append(threading.current_thread().name))
+    status, payload = dispatch(server, "GET", "/me", {}, {"authorization": "Bearer token"})
+    assert status == HTTPStatus.UNAUTHORIZED
+    assert threads and threads[0].startswith("order-api")
+
+
+def test_reports_use_order_totals(files):
+    User.write({"1": {"username": "admin", "email": "admin@order_app.com", "password": "admin", "coupon": None}},
+               User.filename)
+    Order.write({"1": {"user": "1", "items": {}, "total": 0.1, "status": "paid", "date": "2024-05-01T10:00:00"},
+                 "2": {"user": "1", "items": {}, "total": 0.2, "status": "ordered", "date": "2024-05-01T11:00:00"}},
+                Order.filename)
+    server = OrderServer(workers=1)
+    token = sessions.login("admin@order_app.com", "admin").token
+    status, payload = dispatch(server, "GET", "/admin/reports", {}, {"authorization": f"Bearer {token}"})
+    assert status == HTTPStatus.OK
+    assert (payload["orders"], payload["brutto"], payload["paid"]) == (2, 0.3, 0.1)
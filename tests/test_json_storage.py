@@ -0,0 +1,16 @@
+import os
+
+from storage.backends import JsonStorage
+
+ITEMS = "files/items.txt"
+
+
+def test_rewrite_with_same_time_and_size_changes_signature(files):
+    storage = JsonStorage()
+    storage.save(ITEMS, {"1": {"stock": 2}})
+    stat = os.stat(ITEMS)
+    signature = storage.signature(ITEMS)
+    storage.save(ITEMS, {"1": {"stock": 3}})
+    os.utime(ITEMS, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert os.path.getsize(ITEMS) == stat.st_size
+    assert storage.signature(ITEMS) != signature
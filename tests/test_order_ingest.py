@@ -0,0 +1,26 @@
+import pytest
+
+from app_exceptions.exceptions import OrderAPPException
+from services.orders import read_requests
+
+
+def write_csv(tmp_path, text: str) -> str:
+    filename = str(tmp_path / "orders.csv")
+    with open(filename, "w") as writer:
+        writer.write(text)
+    return filename
+
+
+def test_csv_without_order_column_is_rejected(tmp_path):
+    filename = write_csv(tmp_path, "user_id,item_id,quantity\n3,1,2\n4,2,1\n")
+    with pytest.raises(OrderAPPException):
+        list(read_requests(filename))
+
+
+def test_csv_rows_without_order_value_are_rejected_one_by_one(tmp_path):
+    filename = write_csv(tmp_path, "order,user_id,item_id,quantity\na,3,1,2\na,3,2,1\n,4,1,1\n,4,2,1\nb,5,1,1\n")
+    requests = list(read_requests(filename))
+    assert [number for number, _ in requests] == [2, 4, 5, 6]
+    assert requests[0][1] == ("3", {"1": 2, "2": 1}, None)
+    assert all(isinstance(request, OrderAPPException) for _, request in requests[1:3])
+    assert requests[3][1] == ("5", {"1": 1}, None)
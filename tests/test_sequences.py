@@ -0,0 +1,34 @@
+from contextlib import contextmanager
+
+import models.base_class
+from models.base_class import BaseClass
+from models.orders import Order
+from storage.locks import file_lock
+
+
+def test_new_sequence_starts_after_highest_id(files):
+    Order.write({"7": {"user": "3", "items": {}}, "12": {"user": "3", "items": {}}}, Order.filename)
+    assert list(Order.reserve_ids(2)) == [13, 14]
+    assert list(Order.reserve_ids()) == [15]
+
+
+def test_records_file_is_not_locked_under_sequences_lock(files, monkeypatch):
+    Order.write({"5": {"user": "3", "items": {}}}, Order.filename)
+    held = []
+    nested = []
+
+    @contextmanager
+    def recording_lock(filename, shared=False):
+        if BaseClass.sequences_filename in held:
+            nested.append(filename)
+        held.append(filename)
+        try:
+            with file_lock(filename, shared) as acquired:
+                yield acquired
+        finally:
+            held.pop()
+
+    monkeypatch.setattr(models.base_class, "file_lock", recording_lock)
+    Order.clear_cache(Order.filename)  # orders are loaded, and locked, again
+    assert list(Order.reserve_ids()) == [6]
+    assert Order.filename not in nested
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+from models.coupons import Coupon
+from models.sessions import SessionStore
+from models.users import User
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def save_user() -> None:
+    """Save one user with an unused coupon."""
+    User.write({"1": {"username": "ann", "email": "ann@example.com", "password": "secret", "coupon": "c1"}},
+               User.filename)
+    Coupon.write({"c1": {"used": False}}, Coupon.filename)
+
+
+def run_in_other_process(code: str) -> None:
+    """Run code with models imported in another process, in the current working directory."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    subprocess.run([sys.executable, "-c", "from models.coupons import Coupon\nfrom models.users import User\n" + code],
+                   env=env, check=True)
+
+
+def test_user_locked_by_other_process_loses_session(files):
+    save_user()
+    store = SessionStore()
+    session = store.login("ann@example.com", "secret")
+    assert store.get(session.token) is session
+    run_in_other_process("with User.transaction(User.filename) as users:\n"
+                         "    users['1']['password'] = 'locked'")
+    assert store.get(session.token) is None
+    assert len(store) == 0
+
+
+def test_profile_reloads_after_other_process_changes_coupon(files):
+    save_user()
+    store = SessionStore()
+    session = store.login("ann@example.com", "secret")
+    assert store.profile(session)["coupon_used"] is False
+    run_in_other_process("with Coupon.transaction(Coupon.filename) as coupons:\n"
+                         "    coupons['c1']['used'] = True")
+    assert store.profile(session)["coupon_used"] is True
@@ -0,0 +1,25 @@
+from functools import reduce
+
+from models.orders import Order
+from models.sales import Sales
+from sharded_reports import OrderTotals, sum_orders
+
+ORDERS = {
+    "1": {"user": "3", "items": {"1": 2, "2": 1}, "total": 30.1, "status": "paid", "date": "2024-05-01T10:00:00"},
+    "2": {"user": "4", "items": {"2": 3}, "total": 15.2, "status": "ordered", "date": "2024-05-02T10:00:00"},
+    "3": {"user": "3", "items": {"1": 1}, "total": 10.3, "status": "ordered", "date": "2024-05-01T12:00:00"},
+}
+
+
+def test_merged_shards_equal_one_sum():
+    whole = sum_orders(ORDERS.values())
+    merged = reduce(OrderTotals.merge, (sum_orders([order]) for order in ORDERS.values()), OrderTotals())
+    for totals in (whole, merged):
+        assert (totals.orders, totals.brutto_cents, totals.paid_cents) == (3, 5560, 3010)
+        assert totals.sold == {"2024-05-01": {"1": 3, "2": 1}, "2024-05-02": {"2": 3}}
+        assert totals.revenue_by_user() == [("3", 2, 40.4), ("4", 1, 15.2)]
+
+
+def test_sales_counters_are_rebuilt_from_order_totals(files):
+    Order.write(ORDERS, Order.filename)
+    assert Sales.rebuild() == {"total": {"1": 3, "2": 4}, "2024-05-01": {"1": 3, "2": 1}, "2024-05-02": {"2": 3}}
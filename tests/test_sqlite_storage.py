@@ -0,0 +1,26 @@
+import sqlite3
+
+import pytest
+
+from storage.sqlite_storage import SqliteStorage
+
+USERS = "files/users.txt"
+
+
+def test_duplicate_email_is_rejected_not_replaced(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "order_app.db"))
+    storage.init(USERS)
+    storage.save(USERS, {"1": {"username": "ann", "email": "ann@example.com"}})
+    with pytest.raises(sqlite3.IntegrityError):
+        storage.save(USERS, {"1": {"username": "ann", "email": "ann@example.com"},
+                             "2": {"username": "bob", "email": "ann@example.com"}}, ["2"])
+    assert storage.load(USERS) == {"1": {"username": "ann", "email": "ann@example.com"}}
+
+
+def test_changed_record_is_updated_in_place(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "order_app.db"))
+    storage.init(USERS)
+    storage.save(USERS, {"1": {"username": "ann", "email": "ann@example.com"}})
+    storage.save(USERS, {"1": {"username": "ann", "email": "ann@example.org"}}, ["1"])
+    assert storage.load(USERS) == {"1": {"username": "ann", "email": "ann@example.org"}}
+    assert storage.find(USERS, {"email": "ann@example.org"}) == {"1": {"username": "ann", "email": "ann@example.org"}}
@@ -0,0 +1,11 @@
+from storage.stock_table import StockTable
+
+
+def test_only_canonical_item_ids_are_found(tmp_path):
+    table = StockTable(str(tmp_path / "stock.bin"))
+    with table.locked():
+        table.put("1", 10.0, 5)
+    assert table.get("1") == (10.0, 5)
+    assert table.get(1) == (10.0, 5)
+    for item_id in ("01", " 1", "1 ", "+1", "١", "0", "-1", None):
+        assert table.get(item_id) is None
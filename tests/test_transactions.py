@@ -0,0 +1,29 @@
+import os
+
+from models.items import Item
+
+PAST_NS = 1_000_000_000
+
+
+def save_items(items: dict) -> tuple:
+    """Save items and move modification time of stored files to the past, return storage signature."""
+    Item.write(items, Item.filename)
+    for name in (Item.filename, f"{Item.filename}.log"):
+        if os.path.exists(name):
+            os.utime(name, ns=(PAST_NS, PAST_NS))
+    return Item.storage.signature(Item.filename)
+
+
+def test_failed_reservation_does_not_write_items_file(files):
+    signature = save_items({"1": {"name": "Mouse", "price": 10.0, "stock": 2}})
+    assert Item.reserve_stock({"1": 3}) == {"1": 1}
+    assert Item.storage.signature(Item.filename) == signature
+    assert Item.read(Item.filename)["1"]["stock"] == 2
+
+
+def test_reservation_writes_changed_stock(files):
+    signature = save_items({"1": {"name": "Mouse", "price": 10.0, "stock": 2}})
+    assert Item.reserve_stock({"1": 2}) == {}
+    assert Item.storage.signature(Item.filename) != signature
+    Item.clear_cache()
+    assert Item.read(Item.filename)["1"]["stock"] == 0
@@ -1,8 +1,4 @@
-import json
-import os
-from app_exceptions.exceptions import FileAlreadyCreatedException
-
-import pandas as pd
+from storage.backends import get_storage
 
 
 def mprint(*args, delimiter="*", end="\n", sep="\n") -> None:
@@ -26,9 +22,7 @@ def init_file(file: str) -> None:
     :param file: str, file name
     :return: None.
     """
-    records = {}
-    with open(file, "w") as writer:
-        writer.write(json.dumps(records, indent=4))
+    get_storage().init(file)
 
 
 def populate_items(filename: str, item) -> None:
@@ -38,21 +32,17 @@ def populate_items(filename: str, item) -> None:
     :param item: class Item, cannot be imported here directly (circular Import)
     :return: None.
     """
-    file = pd.read_csv(filename)
-    for line in file.itertuples(index=False):
-        item(line.item_name, line.price, line.quantity)
+    for number, row, reason in item.import_csv(filename):
+        print(f"Row {number} {row} not imported: {reason}")
 
 
-def create_excel_file(frame: list, order_id: str) -> None:
+def create_excel_file(frame: list, order_id: str) -> str:
     """
-    Create Excel file using pandas library.
+    Create Excel file with order receipt in export directory.
     :param frame: data frame, list.
     :param order_id: ID of order used for file name.
-    :return: None.
+    :return: path of the file, str.
     """
-    df = pd.DataFrame(frame, columns=["Item ID", "Item Name", "Price", "Quantity", "Total"])
-    filename = f"my_order_{order_id}.xlsx"
-    if filename in os.listdir():
-        raise FileAlreadyCreatedException
-    with pd.ExcelWriter(filename) as writer:
-        df.to_excel(writer, sheet_name="my_order", index=False)
+    from exports import export_receipt  # exports module imports models, which import utils
+
+    return export_receipt(frame, order_id)